@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Greg Albrecht <oss@undef.net>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Benchmark the KML to CoT pipeline against synthetic MapShare feeds.
+
+Times each stage on feeds of 1, 100 & 10k units, plus a feed of long tracks,
+reporting the best of REPEAT runs as units/s & MB/s of KML, and each stage's
+peak traced memory.
+
+Usage: python3 benchmarks/bench_pipeline.py [REPEAT]
+"""
+
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+from configparser import ConfigParser
+from typing import Callable
+
+import inrcot
+import inrcot.functions
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic  # NOQA pylint: disable=wrong-import-position
+
+__author__ = "Greg Albrecht <oss@undef.net>"
+__copyright__ = "Copyright 2023 Greg Albrecht"
+__license__ = "Apache License, Version 2.0"
+
+
+# (units, points per unit) of each synthetic feed:
+SCENARIOS: tuple = ((1, 1), (100, 1), (10000, 1), (100, 100))
+
+
+def make_worker(track_mode: str = "") -> inrcot.Worker:
+    """Make a Worker with a single feed, & an unbounded TX queue."""
+    orig_config: ConfigParser = ConfigParser()
+    orig_config.add_section("inrcot")
+    orig_config.add_section("inrcot_feed_bench")
+    orig_config["inrcot_feed_bench"]["FEED_URL"] = "http://localhost/Feed/Share/x"
+    if track_mode:
+        orig_config["inrcot_feed_bench"]["TRACK_MODE"] = track_mode
+    return inrcot.Worker(asyncio.Queue(), orig_config["inrcot"], orig_config)
+
+
+def measure(func: Callable, repeat: int) -> tuple:
+    """Get the best time of `repeat` calls to `func`, & its peak traced memory."""
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def bench(units: int, points: int, repeat: int) -> None:
+    """Benchmark each pipeline stage on one synthetic feed."""
+    data: bytes = synthetic.make_feed_kml(units, points)
+    folders: list = inrcot.split_feed(data)
+    placemarks: list = [inrcot.parse_placemark(folder) for folder in folders]
+    feed_conf: dict = {}
+
+    loop = asyncio.new_event_loop()
+    worker: inrcot.Worker = make_worker("route" if points > 1 else "")
+    worker_conf: dict = worker.inreach_feeds[0]
+
+    def handle_data() -> None:
+        loop.run_until_complete(worker.handle_data(data, worker_conf))
+        while not worker.queue.empty():
+            worker.queue.get_nowait()
+
+    def stream() -> None:
+        parser = inrcot.KMLFeedParser(track=points > 1)
+        for offset in range(0, len(data), inrcot.READ_CHUNK_SIZE):
+            worker.render_placemarks(
+                parser.feed(data[offset : offset + inrcot.READ_CHUNK_SIZE]),
+                worker_conf,
+            )
+        worker.render_placemarks(parser.close(), worker_conf)
+
+    stages: dict = {
+        "split_feed": lambda: inrcot.split_feed(data),
+        "inreach_to_cot_xml": lambda: [
+            inrcot.functions.inreach_to_cot_xml(folder, feed_conf) for folder in folders
+        ],
+        "inreach_to_cot": lambda: [
+            inrcot.inreach_to_cot(folder, feed_conf) for folder in folders
+        ],
+        "CoTTemplate.render": lambda: [
+            worker.get_cot_template(worker_conf).render(placemark)
+            for placemark in placemarks
+        ],
+        "Worker.handle_data": handle_data,
+        "KMLFeedParser+render": stream,
+    }
+
+    megabytes: float = len(data) / 1e6
+    print(f"\n{units} units x {points} points, {megabytes:.2f} MB of KML:")
+    for name, func in stages.items():
+        best, peak = measure(func, repeat)
+        print(
+            f"  {name:22} {best * 1e3:10.2f} ms {units / best:12,.0f} units/s "
+            f"{megabytes / best:8.1f} MB/s {peak / 2**20:8.1f} MiB peak"
+        )
+
+    loop.run_until_complete(worker.close())
+    loop.close()
+
+
+def main(repeat: int = 3) -> None:
+    """Benchmark every scenario."""
+    for units, points in SCENARIOS:
+        bench(units, points, repeat)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Greg Albrecht <oss@undef.net>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Microbenchmark: inreach_to_cot vs CoTTemplate.render.
+
+Usage: python3 benchmarks/bench_render.py [NUMBER]
+"""
+
+import sys
+import timeit
+
+import inrcot
+
+__author__ = "Greg Albrecht <oss@undef.net>"
+__copyright__ = "Copyright 2023 Greg Albrecht"
+__license__ = "Apache License, Version 2.0"
+
+
+def main(number: int = 20000) -> None:
+    """Time rendering the same Placemark with both CoT renderers."""
+    with open("tests/data/test.kml", "rb") as test_kml_fd:
+        folder = inrcot.split_feed(test_kml_fd.read())[0]
+
+    placemark = inrcot.parse_placemark(folder)
+    feed_conf: dict = {"cot_type": "a-f-G-U-C", "cot_icon": "TACOS/taco.png"}
+    feed_conf["render_context"] = inrcot.make_render_context(feed_conf)
+    cot_template = inrcot.CoTTemplate(feed_conf)
+
+    timings: dict = {
+        "inreach_to_cot(Folder)": lambda: inrcot.inreach_to_cot(folder, feed_conf),
+        "inreach_to_cot(Placemark)": lambda: inrcot.inreach_to_cot(
+            placemark, feed_conf
+        ),
+        "CoTTemplate.render": lambda: cot_template.render(placemark),
+    }
+    for name, func in timings.items():
+        best: float = min(timeit.repeat(func, number=number, repeat=5))
+        print(
+            f"{name:28} {best / number * 1e6:8.2f} us/event "
+            f"{number / best:12,.0f} events/s"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Greg Albrecht <oss@undef.net>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Load test an inrcot Worker against a local MockMapShare, fully offline.
+
+Polls FEEDS simulated ``inrcot_feed_*`` sections for CYCLES cycles, reporting
+each cycle's time, CoT Events/s & the process' peak memory. With --duration,
+runs the Worker's own poll scheduler instead, for that many seconds.
+
+Usage: python3 benchmarks/load_test.py [-h] [--feeds FEEDS] [--cycles CYCLES] ...
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+from configparser import ConfigParser
+
+from aiohttp import web
+
+import inrcot
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import mock_mapshare  # NOQA pylint: disable=wrong-import-position
+
+__author__ = "Greg Albrecht <oss@undef.net>"
+__copyright__ = "Copyright 2023 Greg Albrecht"
+__license__ = "Apache License, Version 2.0"
+
+
+def make_config(base_url: str, args) -> ConfigParser:
+    """Make an inrcot config with `args.feeds` feeds, all polling base_url."""
+    orig_config: ConfigParser = ConfigParser()
+    orig_config.add_section("inrcot")
+    for key, val in args.config:
+        orig_config["inrcot"][key] = val
+    for feed in range(args.feeds):
+        section: str = f"inrcot_feed_{feed}"
+        orig_config.add_section(section)
+        orig_config[section]["FEED_URL"] = f"{base_url}/Feed/Share/{feed}"
+        if args.username:
+            orig_config[section]["FEED_USERNAME"] = args.username
+            orig_config[section]["FEED_PASSWORD"] = args.password or ""
+    return orig_config
+
+
+def drain(queue: asyncio.Queue) -> int:
+    """Empty the TX queue, returning how many items were on it."""
+    items: int = 0
+    while not queue.empty():
+        queue.get_nowait()
+        items += 1
+    return items
+
+
+async def monitor_lag(lags: list, interval: float = 0.01) -> None:
+    """Record how late the event loop wakes from each sleep, in `lags`."""
+    loop = asyncio.get_event_loop()
+    while 1:
+        start: float = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+def max_rss() -> float:
+    """Get this process' peak resident memory, in MiB."""
+    rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+async def load_test(args) -> mock_mapshare.MockMapShare:
+    """Run a MockMapShare, and a Worker polling it, returning the mock."""
+    mock = mock_mapshare.make_mock(args)
+    runner = web.AppRunner(mock.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+    port: int = runner.addresses[0][1]
+
+    orig_config: ConfigParser = make_config(f"http://127.0.0.1:{port}", args)
+    worker = inrcot.Worker(asyncio.Queue(), orig_config["inrcot"], orig_config)
+    print(f"{args.feeds} feeds, {max_rss():.1f} MiB after loading config.")
+
+    lags: list = []
+    lag_monitor = asyncio.ensure_future(monitor_lag(lags))
+    try:
+        if args.duration:
+            start: float = time.perf_counter()
+            try:
+                await asyncio.wait_for(worker.run(), args.duration)
+            except asyncio.TimeoutError:
+                pass
+            elapsed: float = time.perf_counter() - start
+            events: int = drain(worker.queue)
+            print(
+                f"Ran {elapsed:.1f}s: {mock.requests} polls "
+                f"({mock.requests / elapsed:,.1f}/s), {events} events "
+                f"({events / elapsed:,.1f}/s)"
+            )
+        for cycle in range(args.cycles):
+            start = time.perf_counter()
+            await worker.get_inreach_feeds()
+            elapsed = time.perf_counter() - start
+            events = drain(worker.queue)
+            print(
+                f"Cycle {cycle}: {elapsed:8.3f}s, {events} events "
+                f"({events / elapsed:,.0f}/s), {max_rss():.1f} MiB peak, "
+                f"{max(lags or [0]) * 1e3:.1f} ms max event loop lag"
+            )
+            lags.clear()
+    finally:
+        lag_monitor.cancel()
+        await worker.close()
+        await runner.cleanup()
+
+    print(f"Responses by status: {mock.responses}")
+    return mock
+
+
+def make_parser() -> argparse.ArgumentParser:
+    """Make the command line parser for the load test's options."""
+    parser = mock_mapshare.make_parser()
+    parser.description = __doc__.splitlines()[0]
+    parser.set_defaults(port=0)
+    parser.add_argument(
+        "--feeds", type=int, default=1000, help="Feeds to poll. Default: 1000"
+    )
+    parser.add_argument(
+        "--cycles", type=int, default=3, help="Times to poll every feed. Default: 3"
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=0,
+        help="First run the Worker's scheduler for this many seconds.",
+    )
+    parser.add_argument(
+        "--config",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("KEY", "VALUE"),
+        help="Set an inrcot config parameter, eg --config MAX_CONCURRENT_POLLS 50",
+    )
+    return parser
+
+
+def main() -> None:
+    """Parse command line options, and run the load test."""
+    asyncio.run(load_test(make_parser().parse_args()))
+
+
+if __name__ == "__main__":
+    main()
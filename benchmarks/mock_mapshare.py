@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Greg Albrecht <oss@undef.net>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Offline stand-in for Garmin MapShare, serving synthetic KML feeds.
+
+Each feed (/Feed/Share/<feed>) is one unit, whose track gains a point every
+STEP seconds. Responses can be delayed, fail at random, require basic auth,
+and honor MapShare's ``d1`` parameter & conditional GETs (ETag).
+
+Usage: python3 benchmarks/mock_mapshare.py [-h] [--port PORT] ...
+"""
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import os
+import random
+import sys
+import zlib
+
+from typing import Optional
+
+from aiohttp import BasicAuth, hdrs, web
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic  # NOQA pylint: disable=wrong-import-position
+
+__author__ = "Greg Albrecht <oss@undef.net>"
+__copyright__ = "Copyright 2023 Greg Albrecht"
+__license__ = "Apache License, Version 2.0"
+
+
+class MockMapShare:
+    """Serve synthetic MapShare KML feeds."""
+
+    def __init__(  # NOQA pylint: disable=too-many-arguments
+        self,
+        points: int = 1,
+        step: float = 600,
+        latency: float = 0,
+        error_rate: float = 0,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        etag: bool = True,
+    ) -> None:
+        self.points: int = points
+        self.step: float = step
+        self.latency: float = latency
+        self.error_rate: float = error_rate
+        self.auth: Optional[str] = None
+        if username:
+            self.auth = BasicAuth(username, password or "").encode()
+        self.etag: bool = etag
+        self.requests: int = 0
+        self.responses: dict = {}
+
+    def make_app(self) -> web.Application:
+        """Make the aiohttp app serving this mock's feeds."""
+        app = web.Application()
+        app.router.add_get("/Feed/Share/{feed}", self.handle_feed)
+        return app
+
+    def make_feed(self, feed: str, d1: Optional[str] = None) -> bytes:
+        """Make a feed's KML, with only the points after `d1`, if given."""
+        now: float = datetime.datetime.now(datetime.timezone.utc).timestamp()
+        latest: datetime.datetime = datetime.datetime.fromtimestamp(
+            now - now % self.step, datetime.timezone.utc
+        )
+        points: int = self.points
+        if d1:
+            since: datetime.datetime = datetime.datetime.strptime(
+                d1, "%Y-%m-%dT%H:%Mz"
+            ).replace(tzinfo=datetime.timezone.utc)
+            points = min(
+                points, max(int((latest - since).total_seconds() // self.step) + 1, 0)
+            )
+        if not points:
+            return (synthetic.KML_HEAD + synthetic.KML_TAIL).encode("utf-8")
+        index: int = zlib.crc32(feed.encode())
+        return (
+            synthetic.KML_HEAD
+            + synthetic.make_folder(index, points, latest, self.step)
+            + synthetic.KML_TAIL
+        ).encode("utf-8")
+
+    def respond(self, status: int, **kwargs) -> web.Response:
+        """Make & count a response."""
+        self.responses[status] = self.responses.get(status, 0) + 1
+        return web.Response(status=status, **kwargs)
+
+    async def handle_feed(self, request: web.Request) -> web.Response:
+        """Serve one MapShare feed."""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if self.auth and request.headers.get(hdrs.AUTHORIZATION) != self.auth:
+            return self.respond(401)
+        if self.error_rate and random.random() < self.error_rate:
+            return self.respond(503, headers={"Retry-After": "1"})
+
+        body: bytes = self.make_feed(
+            request.match_info["feed"], request.query.get("d1")
+        )
+        if not self.etag:
+            return self.respond(200, body=body)
+        etag: str = f'"{hashlib.sha1(body).hexdigest()}"'
+        if request.headers.get(hdrs.IF_NONE_MATCH) == etag:
+            return self.respond(304)
+        return self.respond(200, body=body, headers={"ETag": etag})
+
+
+def make_parser() -> argparse.ArgumentParser:
+    """Make the command line parser for MockMapShare's options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--points", type=int, default=1, help="Track points per feed. Default: 1"
+    )
+    parser.add_argument(
+        "--step", type=float, default=600, help="Seconds between points. Default: 600"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Mean response delay, in seconds."
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0, help="Fraction of requests to fail."
+    )
+    parser.add_argument("--username", help="Require basic auth with this username.")
+    parser.add_argument("--password", help="...and this password.")
+    parser.add_argument(
+        "--no-etag", dest="etag", action="store_false", help="Don't send ETags."
+    )
+    return parser
+
+
+def make_mock(args: argparse.Namespace) -> MockMapShare:
+    """Make a MockMapShare from parsed command line options."""
+    return MockMapShare(
+        points=args.points,
+        step=args.step,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        username=args.username,
+        password=args.password,
+        etag=args.etag,
+    )
+
+
+def main() -> None:
+    """Run a MockMapShare server until interrupted."""
+    args = make_parser().parse_args()
+    web.run_app(make_mock(args).make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
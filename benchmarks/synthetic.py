@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2023 Greg Albrecht <oss@undef.net>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Synthetic MapShare KML feeds, for benchmarks & load tests."""
+
+import datetime
+
+from typing import Optional
+
+__author__ = "Greg Albrecht <oss@undef.net>"
+__copyright__ = "Copyright 2023 Greg Albrecht"
+__license__ = "Apache License, Version 2.0"
+
+
+KML_HEAD: str = """<?xml version="1.0" encoding="utf-8"?>
+<kml xmlns:xsd="http://www.w3.org/2001/XMLSchema" \
+xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" \
+xmlns="http://www.opengis.net/kml/2.2">
+  <Document>
+    <name>KML Export</name>
+"""
+
+KML_TAIL: str = """  </Document>
+</kml>
+"""
+
+PLACEMARK: str = """      <Placemark>
+        <name>{name}</name>
+        <visibility>true</visibility>
+        <description />
+        <TimeStamp>
+          <when>{when}</when>
+        </TimeStamp>
+        <styleUrl>#style_{index}</styleUrl>
+        <ExtendedData>
+          <Data name="Id">
+            <value>{point_id}</value>
+          </Data>
+          <Data name="Name">
+            <value>{name}</value>
+          </Data>
+          <Data name="Map Display Name">
+            <value>{name}</value>
+          </Data>
+          <Data name="Device Type">
+            <value>inReach Mini</value>
+          </Data>
+          <Data name="IMEI">
+            <value>{imei}</value>
+          </Data>
+          <Data name="Latitude">
+            <value>{lat:.6f}</value>
+          </Data>
+          <Data name="Longitude">
+            <value>{lon:.6f}</value>
+          </Data>
+          <Data name="Elevation">
+            <value>22.63 m from MSL</value>
+          </Data>
+          <Data name="Velocity">
+            <value>4.0 km/h</value>
+          </Data>
+          <Data name="Course">
+            <value>45.00 ° True</value>
+          </Data>
+          <Data name="Valid GPS Fix">
+            <value>True</value>
+          </Data>
+          <Data name="In Emergency">
+            <value>False</value>
+          </Data>
+          <Data name="Text">
+            <value />
+          </Data>
+          <Data name="Event">
+            <value>Tracking interval received.</value>
+          </Data>
+        </ExtendedData>
+        <Point>
+          <extrude>false</extrude>
+          <altitudeMode>absolute</altitudeMode>
+          <coordinates>{lon:.6f},{lat:.6f},22.63</coordinates>
+        </Point>
+      </Placemark>
+"""
+
+LINESTRING: str = """      <Placemark>
+        <name>{name}</name>
+        <visibility>true</visibility>
+        <description>{name}'s track log</description>
+        <styleUrl>#linestyle_{index}</styleUrl>
+        <LineString>
+          <tessellate>true</tessellate>
+          <coordinates>{coordinates}</coordinates>
+        </LineString>
+      </Placemark>
+"""
+
+
+def make_folder(
+    index: int,
+    points: int = 1,
+    start: Optional[datetime.datetime] = None,
+    step: float = 600,
+) -> str:
+    """Make one unit's KML Folder, with a track of `points` points.
+
+    Points are `step` seconds apart, ending at `start`, with each unit walking
+    north-east from its own starting point.
+    """
+    start = start or datetime.datetime(2021, 7, 22, 15, tzinfo=datetime.timezone.utc)
+    name: str = f"Unit {index}"
+    lat0: float = 30 + (index % 1000) * 0.01
+    lon0: float = -120 + (index // 1000) * 0.01
+    parts: list = [f"    <Folder>\n      <name>{name}</name>\n"]
+    coordinates: list = []
+    for point in range(points):
+        when: datetime.datetime = start - datetime.timedelta(
+            seconds=step * (points - 1 - point)
+        )
+        lat: float = lat0 + point * 0.0001
+        lon: float = lon0 + point * 0.0001
+        coordinates.append(f"{lon:.6f},{lat:.6f},22.63")
+        parts.append(
+            PLACEMARK.format(
+                name=name,
+                when=when.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                index=index,
+                point_id=index * 100000 + point,
+                imei=300434030000000 + index,
+                lat=lat,
+                lon=lon,
+            )
+        )
+    parts.append(
+        LINESTRING.format(name=name, index=index, coordinates=" ".join(coordinates))
+    )
+    parts.append("    </Folder>\n")
+    return "".join(parts)
+
+
+def make_feed_kml(
+    folders: int = 1,
+    points: int = 1,
+    start: Optional[datetime.datetime] = None,
+    first: int = 0,
+) -> bytes:
+    """Make a MapShare KML feed of `folders` units, each with `points` points."""
+    return (
+        KML_HEAD
+        + "".join(
+            make_folder(index, points, start) for index in range(first, first + folders)
+        )
+        + KML_TAIL
+    ).encode("utf-8")
@@ -23,11 +23,126 @@
 :source: <https://github.com/ampledata/inrcot>
 """
 
-from .constants import DEFAULT_POLL_INTERVAL, DEFAULT_COT_STALE, DEFAULT_COT_TYPE
+import importlib
+import sys
 
-from .functions import create_tasks, inreach_to_cot, split_feed, create_feeds
+from typing import Optional
+
+from .constants import (
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_COT_STALE,
+    DEFAULT_COT_TYPE,
+    DEFAULT_MAX_CONCURRENT_POLLS,
+    DEFAULT_POLL_TIMEOUT,
+    DEFAULT_CONNECTION_LIMIT,
+    DEFAULT_CONNECTION_LIMIT_PER_HOST,
+    DEFAULT_KEEPALIVE_TIMEOUT,
+    DEFAULT_DNS_CACHE_TTL,
+    DEFAULT_INCREMENTAL_POLL,
+    DEFAULT_BATCH_EVENTS,
+    DEFAULT_MAX_BATCH_SIZE,
+    TRACK_MODES,
+    DEFAULT_TRACK_TOLERANCE,
+    DEFAULT_TRACK_MIN_INTERVAL,
+    DEFAULT_TRACK_WINDOW,
+    DEFAULT_POLL_BACKOFF,
+    DEFAULT_POLL_JITTER,
+    DEFAULT_POLL_ACTIVE_DISTANCE,
+    DEFAULT_POLL_ACTIVE_AGE,
+    DEFAULT_RETRY_INTERVAL_MAX,
+    DEFAULT_CIRCUIT_BREAKER_FAILURES,
+    DEFAULT_CIRCUIT_BREAKER_TIMEOUT,
+    DEFAULT_DEDUP_EVENTS,
+    DEFAULT_DEDUP_CACHE_SIZE,
+    DEFAULT_DEDUP_CACHE_TTL,
+    DEFAULT_DEDUP_REFRESH,
+    DEFAULT_METRICS_ADDR,
+    METRICS_BUCKETS,
+    DEFAULT_PARSE_EXECUTOR,
+    DEFAULT_PARSE_OFFLOAD_SIZE,
+    DEFAULT_LOOP_LAG_INTERVAL,
+    DEFAULT_ROSTER_RELOAD_INTERVAL,
+    DEFAULT_SLOW_POLL,
+    SLOW_POLL_REPORT_SIZE,
+    DEFAULT_COT_DETAIL,
+    COT_UNKNOWN,
+    DEFAULT_SINK_QUEUE_SIZE,
+    DEFAULT_SINK_OVERFLOW,
+    SINK_OVERFLOW_POLICIES,
+    DEFAULT_SINK_RECONNECT_INTERVAL,
+    KML_NS,
+    KML_WHEN_FORMAT,
+    READ_CHUNK_SIZE,
+)
+
+# functions & classes pull in aiohttp, pytak & ElementTree, so they're only
+# imported when one of their names is first used (eagerly on Python 3.6):
+_LAZY_NAMES: dict = {
+    "create_tasks": "functions",
+    "inreach_to_cot": "functions",
+    "split_feed": "functions",
+    "create_feeds": "functions",
+    "create_sinks": "functions",
+    "shard_for": "functions",
+    "read_roster": "functions",
+    "load_roster": "functions",
+    "getboolean": "functions",
+    "batch_events": "functions",
+    "parse_when": "functions",
+    "make_feed_params": "functions",
+    "make_feed_headers": "functions",
+    "parse_placemark": "functions",
+    "parse_track": "functions",
+    "parse_feed": "functions",
+    "douglas_peucker": "functions",
+    "decimate_track": "functions",
+    "make_track_mode": "functions",
+    "distance": "functions",
+    "jitter": "functions",
+    "parse_retry_after": "functions",
+    "escape_attrib": "functions",
+    "escape_text": "functions",
+    "make_cot_names": "functions",
+    "make_render_context": "functions",
+    "get_render_context": "functions",
+    "make_point_detail": "functions",
+    "parse_bbox": "functions",
+    "parse_polygon": "functions",
+    "parse_predicate": "functions",
+    "make_placemark_filter": "functions",
+    "Worker": "classes",
+    "KMLFeedParser": "classes",
+    "Placemark": "classes",
+    "CoTTemplate": "classes",
+    "RenderContext": "classes",
+    "Track": "classes",
+    "PollScheduler": "classes",
+    "EventCache": "classes",
+    "StateStore": "classes",
+    "Metrics": "classes",
+    "Geofence": "classes",
+    "PlacemarkFilter": "classes",
+    "Sink": "classes",
+}
+
+
+def __getattr__(name: str):
+    module: Optional[str] = _LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_NAMES))
+
+
+if sys.version_info[:2] < (3, 7):
+    for _name in _LAZY_NAMES:
+        globals()[_name] = __getattr__(_name)
 
-from .classes import Worker
 
 __author__ = "Greg Albrecht <oss@undef.net>"
 __copyright__ = "Copyright 2023 Greg Albrecht"
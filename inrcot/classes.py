@@ -18,8 +18,21 @@
 """INRCOT Class Definitions."""
 
 import asyncio
+import bisect
+import concurrent.futures
+import datetime
+import heapq
+import os
+import random
+import signal
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
 
-from typing import Optional
+from array import array
+from collections import OrderedDict
+
+from typing import Iterable, Iterator, NamedTuple, Optional
 
 import aiohttp
 
@@ -32,66 +45,1820 @@ __copyright__ = "Copyright 2023 Greg Albrecht"
 __license__ = "Apache License, Version 2.0"
 
 
+class Placemark:
+    """A single inReach position, parsed once from a MapShare KML 'Folder'."""
+
+    __slots__ = (
+        "name",
+        "lat",
+        "lon",
+        "alt",
+        "when",
+        "time",
+        "imei",
+        "device_type",
+        "velocity",
+        "course",
+        "valid_fix",
+        "in_emergency",
+        "text",
+        "event",
+        "track",
+    )
+
+    def __init__(  # NOQA pylint: disable=too-many-arguments
+        self,
+        name: Optional[str],
+        lat: float,
+        lon: float,
+        alt: Optional[float],
+        when: datetime.datetime,
+        time: str,
+        imei: Optional[str] = None,
+        device_type: Optional[str] = None,
+        velocity: Optional[float] = None,
+        course: Optional[float] = None,
+        valid_fix: Optional[bool] = None,
+        in_emergency: Optional[bool] = None,
+        text: Optional[str] = None,
+        event: Optional[str] = None,
+        track: Optional["Track"] = None,
+    ) -> None:
+        self.name: Optional[str] = name
+        self.lat: float = lat
+        self.lon: float = lon
+        self.alt: Optional[float] = alt
+        # Parsed TimeStamp, and the original 'when' text for CoT time & start:
+        self.when: datetime.datetime = when
+        self.time: str = time
+        self.imei: Optional[str] = imei
+        self.device_type: Optional[str] = device_type
+        # Velocity in km/h, Course in degrees true:
+        self.velocity: Optional[float] = velocity
+        self.course: Optional[float] = course
+        self.valid_fix: Optional[bool] = valid_fix
+        self.in_emergency: Optional[bool] = in_emergency
+        self.text: Optional[str] = text
+        self.event: Optional[str] = event
+        # Every point in the Folder, if parsed for TRACK_MODE:
+        self.track: Optional[Track] = track
+
+    def __repr__(self) -> str:
+        return (
+            f"Placemark(name={self.name!r}, lat={self.lat}, lon={self.lon}, "
+            f"when={self.time!r})"
+        )
+
+
+class RenderContext(NamedTuple):
+    """Static values needed to render a feed's CoT, compiled once from its conf."""
+
+    cot_type: str
+    cot_stale: datetime.timedelta
+    cot_icon: Optional[str]
+    # Shared by every Event rendered for this feed, don't modify:
+    usericon: Optional[ET.Element]
+    # (uid, callsign, remarks) if COT_NAME is set, otherwise per-Placemark:
+    names: Optional[tuple]
+    # Whether to send altitude, speed & course (COT_DETAIL):
+    detail: bool = False
+    # How long track points stay part of the trail (TRACK_WINDOW):
+    track_window: datetime.timedelta = datetime.timedelta(
+        hours=inrcot.DEFAULT_TRACK_WINDOW
+    )
+
+
+# A CoT point's hae, ce & le attributes, when they're unknown:
+UNKNOWN_POINT: str = (
+    f'hae="{inrcot.COT_UNKNOWN}" ce="{inrcot.COT_UNKNOWN}" le="{inrcot.COT_UNKNOWN}"'
+)
+
+
+class CoTTemplate:
+    """Render CoT Events for one feed from a precompiled string template.
+
+    Produces the same bytes as `inrcot.inreach_to_cot`, without building an
+    ElementTree per Event. Everything that only depends on the feed's render
+    context is escaped & formatted once, leaving only time, stale, position,
+    (with COT_DETAIL) altitude, speed & course and (unless COT_NAME
+    is set) name to be filled in per Event.
+    """
+
+    __slots__ = (
+        "_stale",
+        "_track_window",
+        "_head",
+        "_tail",
+        "_names",
+        "_name_parts",
+        "_detail",
+    )
+
+    def __init__(self, feed_conf: Optional[dict] = None) -> None:
+        render_context: RenderContext = inrcot.get_render_context(feed_conf)
+        self._stale: datetime.timedelta = render_context.cot_stale
+        self._track_window: float = render_context.track_window.total_seconds()
+        cot_type: str = inrcot.escape_attrib(render_context.cot_type)
+        self._head: str = f'<event version="2.0" type="{cot_type}"'
+        self._detail: bool = render_context.detail
+
+        usericon: str = ""
+        if render_context.cot_icon:
+            cot_icon: str = inrcot.escape_attrib(render_context.cot_icon)
+            usericon = f'<usericon iconsetpath="{cot_icon}" />'
+
+        self._tail: str = f"{usericon}</detail></event>"
+
+        self._names: Optional[tuple] = render_context.names
+        self._name_parts: Optional[tuple] = (
+            self._render_names(render_context.names) if render_context.names else None
+        )
+
+    @staticmethod
+    def _render_names(names: tuple) -> tuple:
+        """Render the name dependent parts of an Event: uid, contact & remarks."""
+        uid, callsign, remarks = names
+        return (
+            inrcot.escape_attrib(uid),
+            f'<detail remarks="{inrcot.escape_attrib(remarks)}">'
+            f'<contact callsign="{inrcot.escape_attrib(callsign)}" />'
+            f"<remarks>{inrcot.escape_text(remarks)}</remarks>",
+        )
+
+    def _render_stale(self) -> str:
+        return (datetime.datetime.now(datetime.timezone.utc) + self._stale).strftime(
+            pytak.ISO_8601_UTC
+        )
+
+    @staticmethod
+    def _render_detail(placemark: Placemark) -> tuple:
+        """Render a Placemark's point hae, ce & le attributes, and track element."""
+        hae, speed, course = inrcot.make_point_detail(placemark)
+        track: str = ""
+        if speed is not None or course is not None:
+            track = (
+                "<track"
+                + (f' speed="{speed}"' if speed is not None else "")
+                + (f' course="{course}"' if course is not None else "")
+                + " />"
+            )
+        return (
+            f'hae="{hae}" ce="{inrcot.COT_UNKNOWN}" le="{inrcot.COT_UNKNOWN}"',
+            track,
+        )
+
+    def uid(self, placemark: Placemark) -> str:
+        """Get the (escaped) CoT uid a Placemark's Event is rendered with."""
+        return (
+            self._name_parts
+            or self._render_names(inrcot.make_cot_names(placemark.name))
+        )[0]
+
+    def render(self, placemark: Placemark) -> bytes:
+        """Render a Placemark as a CoT Event."""
+        uid, detail = self._name_parts or self._render_names(
+            inrcot.make_cot_names(placemark.name)
+        )
+        time: str = inrcot.escape_attrib(placemark.time)
+        point: str = UNKNOWN_POINT
+        track: str = ""
+        if self._detail:
+            point, track = self._render_detail(placemark)
+        return (
+            f'{self._head} uid="{uid}" how="m-g" time="{time}" start="{time}" '
+            f'stale="{self._render_stale()}">'
+            f'<point lat="{placemark.lat}" lon="{placemark.lon}" {point} />'
+            f"{detail}{track}{self._tail}"
+        ).encode("ascii", "xmlcharrefreplace")
+
+    def render_track(
+        self, placemark: Placemark, track: "Track", indices: list, track_mode: str
+    ) -> list:
+        """Render the given points of a Placemark's Track as CoT Events.
+
+        In 'points' mode each point is an Event of its own, with the point's
+        time appended to the uid. As each point is only sent once, it stays
+        until it leaves the TRACK_WINDOW, or for at least COT_STALE. The
+        Placemark's own (latest) point is left out, as `render` already covers
+        it. In 'route' mode the points are rendered as a single drawn line.
+        """
+        if track_mode == "route":
+            route: Optional[bytes] = self.render_route(placemark, track, indices)
+            return [route] if route else []
+
+        uid, detail = self._name_parts or self._render_names(
+            inrcot.make_cot_names(placemark.name)
+        )
+        min_stale: float = time.time() + self._stale.total_seconds()
+        times: list = track.times
+        epochs: array = track.epochs
+        lats: array = track.lats
+        lons: array = track.lons
+        events: list = []
+        for i in indices:
+            if times[i] == placemark.time:
+                continue
+            when: str = inrcot.escape_attrib(times[i])
+            stale: str = datetime.datetime.fromtimestamp(
+                max(min_stale, epochs[i] + self._track_window), datetime.timezone.utc
+            ).strftime(pytak.ISO_8601_UTC)
+            events.append(
+                (
+                    f'{self._head} uid="{uid}.{when}" how="m-g" time="{when}" '
+                    f'start="{when}" stale="{stale}">'
+                    f'<point lat="{lats[i]}" lon="{lons[i]}" {UNKNOWN_POINT} />'
+                    f"{detail}{self._tail}"
+                ).encode("ascii", "xmlcharrefreplace")
+            )
+        return events
+
+    def render_route(
+        self, placemark: Placemark, track: "Track", indices: list
+    ) -> Optional[bytes]:
+        """Render the given points of a Placemark's Track as one CoT drawn line."""
+        if len(indices) < 2:
+            return None
+
+        uid, callsign, remarks = self._names or inrcot.make_cot_names(placemark.name)
+        uid = inrcot.escape_attrib(f"{uid}.track")
+        lats: array = track.lats
+        lons: array = track.lons
+        time: str = inrcot.escape_attrib(track.times[indices[-1]])
+        links: str = "".join(f'<link point="{lats[i]},{lons[i]}" />' for i in indices)
+        return (
+            f'<event version="2.0" type="u-d-f" uid="{uid}" '
+            f'how="h-e" time="{time}" start="{time}" stale="{self._render_stale()}">'
+            f'<point lat="{lats[indices[-1]]}" lon="{lons[indices[-1]]}" '
+            f"{UNKNOWN_POINT} />"
+            f"<detail>{links}"
+            '<strokeColor value="-16776961" /><strokeWeight value="3.0" />'
+            f'<contact callsign="{inrcot.escape_attrib(callsign)} Track" />'
+            f"<remarks>{inrcot.escape_text(remarks)}</remarks>"
+            '<labels_on value="false" /></detail></event>'
+        ).encode("ascii", "xmlcharrefreplace")
+
+
+class Track:
+    """Every point in an inReach 'Folder', oldest first, as parallel arrays."""
+
+    __slots__ = ("times", "epochs", "lats", "lons")
+
+    def __init__(self, times: list, epochs: array, lats: array, lons: array) -> None:
+        # Original 'when' text, for CoT time & start:
+        self.times: list = times
+        # POSIX timestamps:
+        self.epochs: array = epochs
+        self.lats: array = lats
+        self.lons: array = lons
+
+    def __len__(self) -> int:
+        return len(self.epochs)
+
+
+class Geofence:
+    """A polygon geofence, with its edges indexed into latitude bands.
+
+    Points are first checked against the polygon's bounding box, then ray cast
+    against only the edges crossing the point's band, instead of every edge.
+    Polygons crossing the antimeridian aren't supported.
+    """
+
+    __slots__ = ("south", "west", "north", "east", "_band_height", "_bands")
+
+    def __init__(self, points: list, bands: int = 0) -> None:
+        lats: list = [point[0] for point in points]
+        lons: list = [point[1] for point in points]
+        self.south: float = min(lats)
+        self.west: float = min(lons)
+        self.north: float = max(lats)
+        self.east: float = max(lons)
+
+        # About one edge per band, by default:
+        bands = bands or len(points)
+        self._band_height: float = (self.north - self.south) / bands or 1.0
+        self._bands: list = [[] for _ in range(bands)]
+        for index, (lat1, lon1) in enumerate(points):
+            lat2, lon2 = points[index - 1]
+            if lat1 == lat2:
+                # East-west edges are never crossed by an east-west ray:
+                continue
+            for band in range(
+                self._band(min(lat1, lat2)), self._band(max(lat1, lat2)) + 1
+            ):
+                self._bands[band].append((lat1, lon1, lat2, lon2))
+
+    def _band(self, lat: float) -> int:
+        return min(int((lat - self.south) / self._band_height), len(self._bands) - 1)
+
+    def __contains__(self, point: tuple) -> bool:
+        lat, lon = point
+        if not (self.south <= lat <= self.north and self.west <= lon <= self.east):
+            return False
+        inside: bool = False
+        for lat1, lon1, lat2, lon2 in self._bands[self._band(lat)]:
+            if (lat1 > lat) == (lat2 > lat):
+                continue
+            # Toggle for each edge crossed by a ray cast east from the point:
+            if lon < lon1 + (lon2 - lon1) * (lat - lat1) / (lat2 - lat1):
+                inside = not inside
+        return inside
+
+
+class PlacemarkFilter:
+    """Decide which Placemarks to render, before any CoT is built for them.
+
+    A Placemark passes if it's inside the bounding box (south, west, north,
+    east) and geofence, if given, and matches every (attr, test) predicate.
+    Track points, which have no attributes, are tested with `contains`.
+    """
+
+    __slots__ = ("bbox", "geofence", "predicates")
+
+    def __init__(
+        self,
+        bbox: Optional[tuple] = None,
+        geofence: Optional[Geofence] = None,
+        predicates: Iterable[tuple] = (),
+    ) -> None:
+        self.bbox: Optional[tuple] = bbox
+        self.geofence: Optional[Geofence] = geofence
+        self.predicates: tuple = tuple(predicates)
+
+    def __call__(self, placemark: Placemark) -> bool:
+        return self.matches(placemark) and self.contains(placemark.lat, placemark.lon)
+
+    @property
+    def has_area(self) -> bool:
+        """Whether points are filtered by position, not just by attributes."""
+        return self.bbox is not None or self.geofence is not None
+
+    def contains(self, lat: float, lon: float) -> bool:
+        """Check if a position is inside the bounding box & geofence."""
+        if self.bbox is not None:
+            south, west, north, east = self.bbox
+            if not south <= lat <= north:
+                return False
+            if west <= east:
+                if not west <= lon <= east:
+                    return False
+            # Boxes crossing the antimeridian have west > east:
+            elif east < lon < west:
+                return False
+        if self.geofence is not None and (lat, lon) not in self.geofence:
+            return False
+        return True
+
+    def matches(self, placemark: Placemark) -> bool:
+        """Check if a Placemark matches every attribute predicate."""
+        for attr, test in self.predicates:
+            if not test(getattr(placemark, attr)):
+                return False
+        return True
+
+
+class KMLFeedParser:
+    """Incrementally parse an inReach MapShare KML feed, one 'Folder' at a time.
+
+    Bytes are fed in as they arrive, and each Folder is yielded as a Placemark
+    as soon as it has been fully parsed. The Folder is then cleared & dropped
+    from the tree, so memory use doesn't grow with the feed size. If `track`
+    is set, each Placemark also carries every point in its Folder as a Track.
+    """
+
+    def __init__(self, track: bool = False) -> None:
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._document: Optional[ET.Element] = None
+        self._track: bool = track
+
+    def feed(self, data: bytes) -> Iterator[Placemark]:
+        """Feed bytes to the parser, yielding any completed Placemarks."""
+        self._parser.feed(data)
+        return self._read_folders()
+
+    def close(self) -> Iterator[Placemark]:
+        """Finish parsing, yielding any remaining Placemarks."""
+        self._parser.close()
+        return self._read_folders()
+
+    def _read_folders(self) -> Iterator[Placemark]:
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if elem.tag == f"{inrcot.KML_NS}Document" and self._document is None:
+                    self._document = elem
+                continue
+            if elem.tag != f"{inrcot.KML_NS}Folder" or self._document is None:
+                continue
+            placemark: Optional[Placemark] = inrcot.parse_placemark(elem)
+            if placemark is not None and self._track:
+                placemark.track = inrcot.parse_track(elem)
+            elem.clear()
+            if elem in self._document:
+                self._document.remove(elem)
+            if placemark is not None:
+                yield placemark
+
+
+class EventCache:
+    """LRU & TTL bounded cache of the last CoT Event sent for each uid."""
+
+    __slots__ = ("max_size", "ttl", "_entries")
+
+    def __init__(
+        self,
+        max_size: int = inrcot.DEFAULT_DEDUP_CACHE_SIZE,
+        ttl: float = inrcot.DEFAULT_DEDUP_CACHE_TTL,
+    ) -> None:
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_fresh(self, uid: str, key, max_age: float = 0) -> bool:
+        """Was `key` the last thing sent for `uid`, less than `max_age` ago?
+
+        A `max_age` of 0 means an unchanged Event is never stale.
+        """
+        entry: Optional[tuple] = self._entries.get(uid)
+        if entry is None:
+            return False
+        age: float = time.monotonic() - entry[1]
+        if self.ttl and age >= self.ttl:
+            del self._entries[uid]
+            return False
+        self._entries.move_to_end(uid)
+        return entry[0] == key and (max_age <= 0 or age < max_age)
+
+    def add(self, uid: str, key) -> None:
+        """Record `key` as sent for `uid` now, evicting the least recent uids."""
+        self._entries[uid] = (key, time.monotonic())
+        self._entries.move_to_end(uid)
+        while len(self._entries) > self.max_size > 0:
+            self._entries.popitem(last=False)
+
+
+class StateStore:
+    """Persist per-feed poll state to a sqlite database, off the event loop.
+
+    Each feed's state is saved in its own transaction, with sqlite in WAL
+    mode, so a crash loses at most the latest write and never corrupts the
+    file. All database access happens on a single background thread.
+
+    Besides last_when, the cache validators & last position, the last point
+    sent is kept, so a restarted Worker can make conditional GETs and still
+    re-send the point on a 304.
+    """
+
+    # Columns of the last point sent, added after the first release:
+    POINT_COLUMNS: tuple = (
+        ("point_name", "TEXT"),
+        ("point_time", "TEXT"),
+        ("point_lat", "REAL"),
+        ("point_lon", "REAL"),
+        ("point_alt", "REAL"),
+    )
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS feed_state ("
+                    "feed_name TEXT PRIMARY KEY, last_when TEXT, etag TEXT, "
+                    "last_modified TEXT, lat REAL, lon REAL)"
+                )
+                columns: set = {
+                    row[1] for row in self._db.execute("PRAGMA table_info(feed_state)")
+                }
+                for column, kind in self.POINT_COLUMNS:
+                    if column not in columns:
+                        self._db.execute(
+                            f"ALTER TABLE feed_state ADD COLUMN {column} {kind}"
+                        )
+        return self._db
+
+    def _load(self) -> dict:
+        states: dict = {}
+        for (
+            feed_name,
+            last_when,
+            etag,
+            last_modified,
+            lat,
+            lon,
+            point_name,
+            point_time,
+            point_lat,
+            point_lon,
+            point_alt,
+        ) in self._connect().execute(
+            "SELECT feed_name, last_when, etag, last_modified, lat, lon, "
+            "point_name, point_time, point_lat, point_lon, point_alt "
+            "FROM feed_state"
+        ):
+            state: dict = {"etag": etag, "last_modified": last_modified}
+            if last_when:
+                state["last_when"] = inrcot.parse_when(last_when)
+            if lat is not None and lon is not None:
+                state["last_position"] = (lat, lon)
+            point_when: Optional[datetime.datetime] = inrcot.parse_when(point_time)
+            if point_when and point_lat is not None and point_lon is not None:
+                state["last_placemark"] = inrcot.Placemark(
+                    point_name, point_lat, point_lon, point_alt, point_when, point_time
+                )
+            states[feed_name] = state
+        return states
+
+    def _save(self, feed_name: str, row: tuple) -> None:
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO feed_state VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (feed_name,) + row,
+            )
+
+    def _close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    @staticmethod
+    def make_row(feed_state: dict) -> tuple:
+        """Get the persisted fields of a feed's state."""
+        last_when: Optional[datetime.datetime] = feed_state.get("last_when")
+        lat, lon = feed_state.get("last_position") or (None, None)
+        point: Optional[Placemark] = feed_state.get("last_placemark")
+        return (
+            last_when.strftime(inrcot.KML_WHEN_FORMAT) if last_when else None,
+            feed_state.get("etag"),
+            feed_state.get("last_modified"),
+            lat,
+            lon,
+        ) + (
+            (point.name, point.time, point.lat, point.lon, point.alt)
+            if point is not None
+            else (None,) * 5
+        )
+
+    async def load(self) -> dict:
+        """Load the saved state of all feeds, keyed by feed_name."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, self._load)
+
+    async def save(self, feed_name: str, feed_state: dict) -> None:
+        """Save a feed's state, unless it hasn't changed since the last save."""
+        row: tuple = self.make_row(feed_state)
+        if feed_state.get("saved_row") == row:
+            return None
+        feed_state["saved_row"] = row
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self._executor, self._save, feed_name, row)
+
+    async def close(self) -> None:
+        """Wait for pending saves, then close the database."""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self._executor, self._close)
+
+
+class Metrics:
+    """Minimal in-process metrics, rendered in the Prometheus text format.
+
+    Counters & histograms may be labelled. Collected metrics are read from a
+    callback when rendered, eg to report a queue's depth. A callback may return
+    a dict of {labels: value}, with labels as a tuple of (label, value) pairs.
+    """
+
+    def __init__(self, buckets: Iterable[float] = inrcot.METRICS_BUCKETS) -> None:
+        self.buckets: tuple = tuple(buckets)
+        self._help: dict = {}
+        self._samples: dict = {}
+        self._collectors: dict = {}
+
+    def describe(self, name: str, kind: str, text: str) -> None:
+        """Declare a metric's type ('counter', 'gauge' or 'histogram') & help."""
+        self._help[name] = (kind, text)
+        self._samples.setdefault(name, {})
+
+    def collect(self, name: str, kind: str, text: str, func) -> None:
+        """Declare a metric whose value is read from `func()` when rendered."""
+        self.describe(name, kind, text)
+        self._collectors[name] = func
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a counter."""
+        samples: dict = self._samples.setdefault(name, {})
+        key: tuple = tuple(sorted(labels.items()))
+        samples[key] = samples.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record a value in a histogram."""
+        samples: dict = self._samples.setdefault(name, {})
+        key: tuple = tuple(sorted(labels.items()))
+        histogram: Optional[list] = samples.get(key)
+        if histogram is None:
+            histogram = samples[key] = [[0] * len(self.buckets), 0.0, 0]
+        index: int = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            histogram[0][index] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    def get(self, name: str, **labels) -> float:
+        """Get a counter's value, or a histogram's count."""
+        sample = self._samples.get(name, {}).get(tuple(sorted(labels.items())), 0)
+        return sample[2] if isinstance(sample, list) else sample
+
+    @staticmethod
+    def _labels(labels: Iterable[tuple]) -> str:
+        rendered: str = ",".join(
+            '{}="{}"'.format(
+                key,
+                str(val).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+            )
+            for key, val in labels
+        )
+        return f"{{{rendered}}}" if rendered else ""
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: list = []
+        for name, samples in self._samples.items():
+            kind, text = self._help.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if name in self._collectors:
+                value = self._collectors[name]()
+                if not isinstance(value, dict):
+                    value = {(): value}
+                for key, sample in value.items():
+                    lines.append(f"{name}{self._labels(key)} {sample}")
+                continue
+            for key, sample in samples.items():
+                if kind != "histogram":
+                    lines.append(f"{name}{self._labels(key)} {sample}")
+                    continue
+                cumulative: int = 0
+                for bucket, count in zip(self.buckets, sample[0]):
+                    cumulative += count
+                    labels = self._labels(key + (("le", bucket),))
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                labels = self._labels(key + (("le", "+Inf"),))
+                lines.append(f"{name}_bucket{labels} {sample[2]}")
+                lines.append(f"{name}_sum{self._labels(key)} {sample[1]}")
+                lines.append(f"{name}_count{self._labels(key)} {sample[2]}")
+        return "\n".join(lines) + "\n"
+
+
+class PollScheduler:
+    """Keep a next-due time for each feed, in a heap ordered by due time."""
+
+    def __init__(self) -> None:
+        self._heap: list = []
+        self._seq: int = 0
+        self._wakeup: asyncio.Event = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, key, delay: float) -> None:
+        """Schedule `key` to be due in `delay` seconds."""
+        loop = asyncio.get_event_loop()
+        self._seq += 1
+        heapq.heappush(self._heap, (loop.time() + max(delay, 0), self._seq, key))
+        self._wakeup.set()
+
+    async def wait_due(self) -> list:
+        """Wait until at least one key is due, then pop & return all due keys."""
+        loop = asyncio.get_event_loop()
+        while 1:
+            self._wakeup.clear()
+            timeout: Optional[float] = None
+            if self._heap:
+                timeout = self._heap[0][0] - loop.time()
+                if timeout <= 0:
+                    break
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        now: float = loop.time()
+        due: list = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+
+class Sink(pytak.TXWorker):
+    """Send CoT Events to one more COT_URL, from the Sink's own bounded queue.
+
+    The Worker puts each rendered Event on every Sink's queue. When a queue is
+    full, the Sink's SINK_OVERFLOW policy drops its oldest ('drop_oldest') or
+    the newest ('drop_newest') Event, or waits for room ('block'), so only a
+    'block' Sink can hold up polling. 'file://' COT_URLs are appended to, as an
+    archive. A Sink whose connection fails reconnects, dropping what it can't
+    send meanwhile.
+    """
+
+    def __init__(self, name: str, config) -> None:
+        super().__init__(
+            asyncio.Queue(
+                int(config.get("SINK_QUEUE_SIZE", inrcot.DEFAULT_SINK_QUEUE_SIZE))
+            ),
+            config,
+            None,
+        )
+        self.name: str = name
+        self.overflow: str = (
+            config.get("SINK_OVERFLOW") or inrcot.DEFAULT_SINK_OVERFLOW
+        ).lower()
+        if self.overflow not in inrcot.SINK_OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid SINK_OVERFLOW for {name}: {self.overflow}")
+        self.reconnect_interval: float = float(
+            config.get(
+                "SINK_RECONNECT_INTERVAL", inrcot.DEFAULT_SINK_RECONNECT_INTERVAL
+            )
+        )
+        self.counters: dict = {"sent": 0, "dropped": 0}
+
+    def __repr__(self) -> str:
+        return f"Sink(name={self.name!r}, overflow={self.overflow!r})"
+
+    async def put(self, data: bytes) -> None:
+        """Queue data to send, following SINK_OVERFLOW if the queue is full."""
+        queue: asyncio.Queue = self.queue
+        if not queue.full():
+            queue.put_nowait(data)
+        elif self.overflow == "block":
+            await queue.put(data)
+        else:
+            self.counters["dropped"] += 1
+            if self.overflow == "drop_oldest":
+                queue.get_nowait()
+                queue.put_nowait(data)
+
+    async def connect(self) -> None:
+        """Open this Sink's COT_URL."""
+        cot_url: str = self.config.get("COT_URL")
+        self._logger.info("Sink %s using COT_URL='%s'", self.name, cot_url)
+        if cot_url.lower().startswith("file://"):
+            self.writer = open(  # NOQA pylint: disable=consider-using-with
+                cot_url[len("file://") :], "ab"
+            )
+        else:
+            _, self.writer = await pytak.protocol_factory(self.config)
+
+    async def run(self, number_of_iterations=-1) -> None:
+        """Send queued data to COT_URL, reconnecting if the connection fails."""
+        self._logger.info("Run: %s", self)
+        while 1:
+            if self.writer is None:
+                try:
+                    await self.connect()
+                except OSError as exc:
+                    self._logger.warning(
+                        "Unable to connect sink %s, retrying in %ss: %s",
+                        self.name,
+                        self.reconnect_interval,
+                        exc,
+                    )
+                    await asyncio.sleep(self.reconnect_interval)
+                    continue
+
+            data: bytes = await self.queue.get()
+            try:
+                await self.send_data(data)
+            except OSError as exc:
+                self._logger.warning("Sink %s failed, reconnecting: %s", self.name, exc)
+                self.counters["dropped"] += 1
+                self.close_writer()
+                continue
+            self.counters["sent"] += 1
+
+    def close_writer(self) -> None:
+        """Close this Sink's connection or file, if open."""
+        writer, self.writer = self.writer, None
+        if writer is not None and hasattr(writer, "close"):
+            try:
+                writer.close()
+            except OSError:
+                pass
+
+    async def close(self) -> None:
+        """Close this Sink's connection or file."""
+        self.close_writer()
+
+
 class Worker(pytak.QueueWorker):
     """Read inReach Feed, renders to CoT, and puts on a TX queue."""
 
     def __init__(self, queue: asyncio.Queue, config, orig_config) -> None:
         super().__init__(queue, config)
-        self.inreach_feeds: list = inrcot.create_feeds(orig_config)
+        self.inreach_feeds: list = []
+        self._feeds_by_name: dict = {}
+        self.cot_templates: dict = {}
+        self.shard: int = int(self.config.get("SHARD") or 0)
+        self.shards: int = int(self.config.get("SHARDS") or 1)
+        self.orig_config = orig_config
+        self.feed_roster: Optional[str] = self.config.get("FEED_ROSTER")
+        self.roster_reload_interval: float = float(
+            self.config.get(
+                "ROSTER_RELOAD_INTERVAL", inrcot.DEFAULT_ROSTER_RELOAD_INTERVAL
+            )
+        )
+        self._roster_stat: Optional[tuple] = None
+        self.load_feeds(orig_config)
+        # Extra outputs each Event is fanned out to, besides COT_URL:
+        self.sinks: list = inrcot.create_sinks(orig_config, self.config)
+
+        max_concurrent_polls: int = int(
+            self.config.get("MAX_CONCURRENT_POLLS", inrcot.DEFAULT_MAX_CONCURRENT_POLLS)
+        )
+        self._poll_semaphore = asyncio.Semaphore(max_concurrent_polls)
+        self._poll_timeout = aiohttp.ClientTimeout(
+            total=int(self.config.get("POLL_TIMEOUT", inrcot.DEFAULT_POLL_TIMEOUT))
+        )
+        self.session: Optional[aiohttp.ClientSession] = None
+
+        # Per-feed poll state, keyed by feed_name:
+        self.feed_state: dict = {}
+        self.counters: dict = {
+            "not_modified": 0,
+            "deduplicated": 0,
+            "dropped": 0,
+            "filtered": 0,
+        }
+        # Only Placemarks passing FILTER_BBOX, FILTER_POLYGON & FILTER_ATTRIBUTES
+        # are rendered:
+        self.placemark_filter: Optional[PlacemarkFilter] = inrcot.make_placemark_filter(
+            self.config
+        )
+        # Per-feed failure backoff & circuit breaker:
+        self.retry_interval_max: float = float(
+            self.config.get("RETRY_INTERVAL_MAX", inrcot.DEFAULT_RETRY_INTERVAL_MAX)
+        )
+        self.circuit_breaker_failures: int = int(
+            self.config.get(
+                "CIRCUIT_BREAKER_FAILURES", inrcot.DEFAULT_CIRCUIT_BREAKER_FAILURES
+            )
+        )
+        self.circuit_breaker_timeout: float = float(
+            self.config.get(
+                "CIRCUIT_BREAKER_TIMEOUT", inrcot.DEFAULT_CIRCUIT_BREAKER_TIMEOUT
+            )
+        )
+
+        # Instrumentation, optionally served over HTTP for Prometheus:
+        self.metrics: Metrics = inrcot.Metrics()
+        self.metrics_port: int = int(self.config.get("METRICS_PORT") or 0)
+        if self.metrics_port:
+            # Each shard serves its own metrics, on consecutive ports:
+            self.metrics_port += self.shard
+        self.metrics_addr: str = self.config.get(
+            "METRICS_ADDR", inrcot.DEFAULT_METRICS_ADDR
+        )
+        self._metrics_runner: Optional["aiohttp.web.AppRunner"] = None
+        self.describe_metrics()
+
+        # Parse large feeds off the event loop, in a thread or process pool:
+        self.parse_executor: Optional[concurrent.futures.Executor] = (
+            self.make_parse_executor()
+        )
+        self.parse_offload_size: int = int(
+            self.config.get("PARSE_OFFLOAD_SIZE", inrcot.DEFAULT_PARSE_OFFLOAD_SIZE)
+        )
+        self.loop_lag_interval: float = float(
+            self.config.get("LOOP_LAG_INTERVAL", inrcot.DEFAULT_LOOP_LAG_INTERVAL)
+        )
+
+        # Opt-in profiling: slow polls' per-stage timings, and cProfile on a signal:
+        self.slow_poll: float = float(
+            self.config.get("SLOW_POLL", inrcot.DEFAULT_SLOW_POLL)
+        )
+        self.slow_polls: list = []
+        self.profile_signal: Optional[str] = self.config.get("PROFILE_SIGNAL")
+        self.profile_dir: Optional[str] = self.config.get("PROFILE_DIR")
+        self._profiler = None
+        self._profile_signum: Optional[int] = None
+
+        # Optional on-disk copy of feed_state, for warm restarts:
+        self.state_store: Optional[StateStore] = None
+        state_file: Optional[str] = self.config.get("STATE_FILE")
+        if state_file:
+            self.state_store = inrcot.StateStore(state_file)
+
+        # Adaptive per-feed poll scheduling:
+        self.scheduler: PollScheduler = inrcot.PollScheduler()
+        self.poll_interval: float = float(
+            self.config.get("POLL_INTERVAL", inrcot.DEFAULT_POLL_INTERVAL)
+        )
+        self.poll_interval_min: float = float(
+            self.config.get("POLL_INTERVAL_MIN") or self.poll_interval
+        )
+        self.poll_interval_max: float = float(
+            self.config.get("POLL_INTERVAL_MAX") or self.poll_interval
+        )
+        self.poll_backoff: float = float(
+            self.config.get("POLL_BACKOFF", inrcot.DEFAULT_POLL_BACKOFF)
+        )
+        self.poll_jitter: float = float(
+            self.config.get("POLL_JITTER", inrcot.DEFAULT_POLL_JITTER)
+        )
+        self.poll_active_distance: float = float(
+            self.config.get("POLL_ACTIVE_DISTANCE", inrcot.DEFAULT_POLL_ACTIVE_DISTANCE)
+        )
+        self.poll_active_age: float = float(
+            self.config.get("POLL_ACTIVE_AGE", inrcot.DEFAULT_POLL_ACTIVE_AGE)
+        )
+
+        self.incremental_poll: bool = inrcot.getboolean(
+            self.config, "INCREMENTAL_POLL", inrcot.DEFAULT_INCREMENTAL_POLL
+        )
+
+        # Suppress unchanged CoT Events, refreshing them every so often:
+        self.dedup_cache: Optional[EventCache] = None
+        if inrcot.getboolean(self.config, "DEDUP_EVENTS", inrcot.DEFAULT_DEDUP_EVENTS):
+            self.dedup_cache = inrcot.EventCache(
+                int(
+                    self.config.get("DEDUP_CACHE_SIZE", inrcot.DEFAULT_DEDUP_CACHE_SIZE)
+                ),
+                float(
+                    self.config.get("DEDUP_CACHE_TTL", inrcot.DEFAULT_DEDUP_CACHE_TTL)
+                ),
+            )
+        self.dedup_refresh: float = float(
+            self.config.get("DEDUP_REFRESH", inrcot.DEFAULT_DEDUP_REFRESH)
+        )
+
+        self.batch_events: bool = inrcot.getboolean(
+            self.config, "BATCH_EVENTS", inrcot.DEFAULT_BATCH_EVENTS
+        )
+        self.max_batch_size: int = int(
+            self.config.get("MAX_BATCH_SIZE", inrcot.DEFAULT_MAX_BATCH_SIZE)
+        )
+        if self.batch_events and int(self.config.get("TAK_PROTO") or 0) > 0:
+            self._logger.warning("BATCH_EVENTS isn't supported with TAK_PROTO > 0.")
+            self.batch_events = False
+
+    def describe_metrics(self) -> None:
+        """Declare this Worker's metrics."""
+        metrics: Metrics = self.metrics
+        metrics.describe(
+            "inrcot_poll_duration_seconds",
+            "histogram",
+            "Time taken to request, parse & render a feed, by feed & outcome.",
+        )
+        metrics.describe(
+            "inrcot_downloaded_bytes_total", "counter", "KML downloaded, by feed."
+        )
+        metrics.describe(
+            "inrcot_http_responses_total", "counter", "MapShare responses, by status."
+        )
+        metrics.describe(
+            "inrcot_parse_seconds_total", "counter", "Time spent parsing KML."
+        )
+        metrics.describe(
+            "inrcot_render_seconds_total", "counter", "Time spent rendering CoT."
+        )
+        metrics.describe(
+            "inrcot_events_total", "counter", "CoT Events produced, by feed."
+        )
+        metrics.describe(
+            "inrcot_event_loop_lag_seconds",
+            "histogram",
+            "How late the event loop woke from a sleep.",
+        )
+        for name, text in (
+            ("not_modified", "Feed polls answered 304 Not Modified."),
+            ("deduplicated", "Unchanged points not sent as CoT."),
+            ("dropped", "CoT Events dropped, as the TX queue was full."),
+            ("filtered", "Points not sent as CoT, as they didn't pass the filter."),
+        ):
+            metrics.collect(
+                f"inrcot_{name}_total",
+                "counter",
+                text,
+                lambda name=name: self.counters.get(name, 0),
+            )
+        metrics.collect(
+            "inrcot_tx_queue_depth",
+            "gauge",
+            "CoT Events on the TX queue.",
+            self.queue.qsize,
+        )
+        metrics.collect(
+            "inrcot_sink_queue_depth",
+            "gauge",
+            "CoT Events on each sink's queue.",
+            lambda: {(("sink", sink.name),): sink.queue.qsize() for sink in self.sinks},
+        )
+        for name, text in (
+            ("sent", "CoT Events sent, by sink."),
+            ("dropped", "CoT Events dropped, by sink."),
+        ):
+            metrics.collect(
+                f"inrcot_sink_{name}_total",
+                "counter",
+                text,
+                lambda name=name: {
+                    (("sink", sink.name),): sink.counters[name] for sink in self.sinks
+                },
+            )
+
+    async def handle_metrics(
+        self, request: "aiohttp.web.Request"
+    ) -> "aiohttp.web.Response":
+        """Serve this Worker's metrics to Prometheus."""
+        return aiohttp.web.Response(
+            text=self.metrics.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def start_metrics_server(self) -> None:
+        """Serve metrics on http://METRICS_ADDR:METRICS_PORT/metrics, if enabled."""
+        if not self.metrics_port or self._metrics_runner is not None:
+            return None
+        from aiohttp import web  # NOQA pylint: disable=import-outside-toplevel
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._metrics_runner = web.AppRunner(app)
+        await self._metrics_runner.setup()
+        site = web.TCPSite(self._metrics_runner, self.metrics_addr, self.metrics_port)
+        await site.start()
+        self._logger.info(
+            "Serving metrics at http://%s:%s/metrics",
+            self.metrics_addr,
+            self.metrics_port,
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=int(
+                    self.config.get("CONNECTION_LIMIT", inrcot.DEFAULT_CONNECTION_LIMIT)
+                ),
+                limit_per_host=int(
+                    self.config.get(
+                        "CONNECTION_LIMIT_PER_HOST",
+                        inrcot.DEFAULT_CONNECTION_LIMIT_PER_HOST,
+                    )
+                ),
+                keepalive_timeout=int(
+                    self.config.get(
+                        "KEEPALIVE_TIMEOUT", inrcot.DEFAULT_KEEPALIVE_TIMEOUT
+                    )
+                ),
+                ttl_dns_cache=int(
+                    self.config.get("DNS_CACHE_TTL", inrcot.DEFAULT_DNS_CACHE_TTL)
+                ),
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=self._poll_timeout
+            )
+        return self.session
+
+    async def close(self) -> None:
+        """Close the shared HTTP session, and the state store."""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        if self.state_store is not None:
+            await self.state_store.close()
+        if self._metrics_runner is not None:
+            await self._metrics_runner.cleanup()
+            self._metrics_runner = None
+        if self.parse_executor is not None:
+            self.parse_executor.shutdown(wait=False)
+            self.parse_executor = None
+        if self._profile_signum is not None:
+            asyncio.get_event_loop().remove_signal_handler(self._profile_signum)
+            self._profile_signum = None
+        if self._profiler is not None:
+            self.toggle_profiler()
+
+    def make_parse_executor(self) -> Optional[concurrent.futures.Executor]:
+        """Make the PARSE_EXECUTOR pool large feeds are parsed in, if any."""
+        kind: str = (
+            self.config.get("PARSE_EXECUTOR", inrcot.DEFAULT_PARSE_EXECUTOR) or ""
+        ).lower()
+        if not kind:
+            return None
+        max_workers: Optional[int] = (
+            int(self.config.get("PARSE_EXECUTOR_WORKERS") or 0) or None
+        )
+        if kind == "process":
+            return concurrent.futures.ProcessPoolExecutor(max_workers)
+        if kind == "thread":
+            return concurrent.futures.ThreadPoolExecutor(max_workers)
+        self._logger.warning("Unknown PARSE_EXECUTOR, parsing inline: %s", kind)
+        return None
+
+    async def monitor_loop_lag(self) -> None:
+        """Measure how late the event loop wakes up, as a sign it's blocked."""
+        loop = asyncio.get_event_loop()
+        while 1:
+            start: float = loop.time()
+            await asyncio.sleep(self.loop_lag_interval)
+            lag: float = max(loop.time() - start - self.loop_lag_interval, 0)
+            self.metrics.observe("inrcot_event_loop_lag_seconds", lag)
+            if lag > self.loop_lag_interval:
+                self._logger.debug("Event loop lagged by %.3fs", lag)
+
+    def install_profile_signal(self) -> None:
+        """Toggle cProfile whenever this process gets PROFILE_SIGNAL, if set."""
+        if not self.profile_signal:
+            return None
+        name: str = self.profile_signal.upper()
+        if not name.startswith("SIG"):
+            name = f"SIG{name}"
+        try:
+            signum: int = getattr(signal, name)
+            asyncio.get_event_loop().add_signal_handler(signum, self.toggle_profiler)
+        except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+            self._logger.warning("Unable to profile on signal: %s", name)
+            return None
+        self._profile_signum = signum
+        self._logger.info("Send %s to pid %s to toggle profiling.", name, os.getpid())
+
+    def toggle_profiler(self) -> Optional[str]:
+        """Start profiling, or stop & dump the profile, returning its path."""
+        if self._profiler is None:
+            import cProfile  # NOQA pylint: disable=import-outside-toplevel
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+            self._logger.info("Profiling started.")
+            return None
+
+        self._profiler.disable()
+        if not self.profile_dir:
+            import tempfile  # NOQA pylint: disable=import-outside-toplevel
+
+            self.profile_dir = tempfile.gettempdir()
+        path: str = os.path.join(
+            self.profile_dir, f"inrcot-{os.getpid()}-{int(time.time())}.prof"
+        )
+        try:
+            self._profiler.dump_stats(path)
+            self._logger.info("Profiling stopped, wrote profile to %s", path)
+        except OSError as exc:
+            self._logger.warning("Unable to write profile: %s", exc)
+        self._profiler = None
+        return path
+
+    @staticmethod
+    def add_timing(feed_state: dict, stage: str, seconds: float) -> None:
+        """Add to the time a poll spent in a stage, if its stages are being timed."""
+        timings: Optional[dict] = feed_state.get("timings")
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0) + seconds
+
+    def record_timings(self, feed_name: Optional[str], feed_state: dict) -> None:
+        """Keep a finished poll's stage timings, if it was slower than SLOW_POLL."""
+        timings: dict = feed_state.pop("timings")
+        total: float = time.perf_counter() - timings.pop("start")
+        if total < self.slow_poll:
+            return None
+        # Whatever wasn't parsing, rendering or queuing was spent on the network:
+        timings["network"] = max(total - sum(timings.values()), 0)
+        self.slow_polls.append((total, feed_name, timings))
+
+    def report_slow_polls(self) -> None:
+        """Log the slowest feeds polled since the last report, with their stages."""
+        if not self.slow_polls:
+            return None
+        worst: list = heapq.nlargest(
+            inrcot.SLOW_POLL_REPORT_SIZE, self.slow_polls, key=lambda poll: poll[0]
+        )
+        self._logger.warning(
+            "%s polls took over %ss, slowest: %s",
+            len(self.slow_polls),
+            self.slow_poll,
+            "; ".join(
+                f"{feed_name} {total:.3f}s ("
+                + ", ".join(
+                    f"{stage} {seconds:.3f}s"
+                    for stage, seconds in sorted(timings.items())
+                )
+                + ")"
+                for total, feed_name, timings in worst
+            ),
+        )
+        self.slow_polls = []
+
+    async def monitor_slow_polls(self) -> None:
+        """Report slow polls once every POLL_INTERVAL."""
+        while 1:
+            await asyncio.sleep(self.poll_interval)
+            self.report_slow_polls()
+
+    async def load_state(self) -> None:
+        """Restore each feed's saved poll state, for a warm restart."""
+        if self.state_store is None:
+            return None
+        for feed_name, state in (await self.state_store.load()).items():
+            if feed_name in self._feeds_by_name:
+                feed_state: dict = self.feed_state.setdefault(feed_name, {})
+                feed_state.update(state)
+                feed_state["saved_row"] = self.state_store.make_row(feed_state)
+        self._logger.info("Loaded state for %s feeds.", len(self.feed_state))
+
+    def load_feeds(self, orig_config) -> None:
+        """(Re)load feed confs, and compile their CoT templates.
+
+        Feeds come from the config's inrcot_feed_* sections, then FEED_ROSTER.
+        """
+        feeds: list = inrcot.create_feeds(orig_config, self.shard, self.shards)
+        if self.feed_roster:
+            self._roster_stat = self.stat_roster()
+            feeds.extend(inrcot.load_roster(self.feed_roster, self.shard, self.shards))
+            self._logger.info("Loaded %s feeds from %s", len(feeds), self.feed_roster)
+        self.inreach_feeds = feeds
+        self._feeds_by_name = {
+            feed_conf.get("feed_name"): feed_conf for feed_conf in self.inreach_feeds
+        }
+        self.cot_templates = {
+            feed_conf.get("feed_name"): inrcot.CoTTemplate(feed_conf)
+            for feed_conf in self.inreach_feeds
+        }
+
+    def stat_roster(self) -> Optional[tuple]:
+        """Get the FEED_ROSTER's modification time & size, to spot changes."""
+        try:
+            stat: os.stat_result = os.stat(self.feed_roster)
+        except (OSError, TypeError):
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload_feeds(self) -> bool:
+        """Reload feeds, scheduling any new ones, if the FEED_ROSTER changed.
+
+        An invalid roster is logged & ignored, leaving the current feeds as-is.
+        """
+        if self.stat_roster() == self._roster_stat:
+            return False
+        old_feeds: set = set(self._feeds_by_name)
+        try:
+            self.load_feeds(self.orig_config)
+        except (OSError, ValueError) as exc:
+            self._roster_stat = self.stat_roster()
+            self._logger.warning("Not reloading invalid feed roster: %s", exc)
+            return False
+        for feed_name in set(self._feeds_by_name) - old_feeds:
+            self.scheduler.schedule(
+                feed_name, random.uniform(0, self.poll_jitter * self.poll_interval)
+            )
+        for feed_name in old_feeds - set(self._feeds_by_name):
+            self.feed_state.pop(feed_name, None)
+        return True
+
+    async def watch_roster(self) -> None:
+        """Reload feeds whenever the FEED_ROSTER changes."""
+        while 1:
+            await asyncio.sleep(self.roster_reload_interval)
+            try:
+                self.reload_feeds()
+            except Exception as exc:  # NOQA pylint: disable=broad-except
+                self._logger.warning("Failed to reload feed roster: %s", exc)
+                self._logger.debug(exc, exc_info=True)
+
+    def get_cot_template(self, feed_conf: dict) -> CoTTemplate:
+        """Get the precompiled CoT template for a feed."""
+        feed_name: Optional[str] = feed_conf.get("feed_name")
+        cot_template: Optional[CoTTemplate] = self.cot_templates.get(feed_name)
+        if cot_template is None:
+            cot_template = inrcot.CoTTemplate(feed_conf)
+            if feed_name:
+                self.cot_templates[feed_name] = cot_template
+        return cot_template
 
     async def handle_data(self, data: bytes, feed_conf: dict) -> None:
         """Handle the response from the inReach API."""
-        feeds: Optional[list] = inrcot.split_feed(data)
-        if not feeds:
+        start: float = time.perf_counter()
+        self.metrics.inc(
+            "inrcot_downloaded_bytes_total", len(data), feed=feed_conf.get("feed_name")
+        )
+        feed_state: dict = self.feed_state.setdefault(feed_conf.get("feed_name"), {})
+        track: bool = bool(feed_conf.get("track_mode"))
+        placemarks: list
+        if self.parse_executor is not None and len(data) >= self.parse_offload_size:
+            loop = asyncio.get_event_loop()
+            placemarks = await loop.run_in_executor(
+                self.parse_executor, inrcot.parse_feed, data, track
+            )
+        else:
+            placemarks = inrcot.parse_feed(data, track)
+        parse_time: float = time.perf_counter() - start
+        self.metrics.inc("inrcot_parse_seconds_total", parse_time)
+        self.add_timing(feed_state, "parse", parse_time)
+
+        last_placemark: Optional[Placemark] = feed_state.get("last_placemark")
+        events: list = []
+        if placemarks:
+            events = self.render_placemarks(
+                placemarks, feed_conf, feed_state.get("last_when")
+            )
+        if not events and feed_state.get("last_placemark") is last_placemark:
+            # No new points, so keep the latest one from going stale:
+            await self.refresh_feed(feed_conf, feed_state)
+            return None
+        await self.put_events(events, feed_state)
+
+    async def handle_response(
+        self, response: aiohttp.ClientResponse, feed_conf: dict
+    ) -> None:
+        """Handle the response from the inReach API, parsing it as it streams in.
+
+        If a PARSE_EXECUTOR is configured, responses are instead read whole, so
+        those of at least PARSE_OFFLOAD_SIZE bytes can be parsed in it.
+        """
+        if self.parse_executor is not None:
+            # Content-Length is missing from chunked responses, and is the
+            # compressed size of gzipped ones, so decide by the body's size:
+            await self.handle_data(await response.read(), feed_conf)
             return None
-        for feed in feeds:
-            event: Optional[bytes] = inrcot.inreach_to_cot(feed, feed_conf)
-            if not event:
+
+        feed_state: dict = self.feed_state.setdefault(feed_conf.get("feed_name"), {})
+        last_when = feed_state.get("last_when")
+        last_placemark: Optional[Placemark] = feed_state.get("last_placemark")
+        parser = inrcot.KMLFeedParser(track=bool(feed_conf.get("track_mode")))
+        events: list = []
+        try:
+            async for chunk in response.content.iter_chunked(inrcot.READ_CHUNK_SIZE):
+                self.metrics.inc(
+                    "inrcot_downloaded_bytes_total",
+                    len(chunk),
+                    feed=feed_conf.get("feed_name"),
+                )
+                events.extend(
+                    self.render_chunk(
+                        parser.feed(chunk), feed_conf, feed_state, last_when
+                    )
+                )
+            events.extend(
+                self.render_chunk(parser.close(), feed_conf, feed_state, last_when)
+            )
+        except Exception:
+            # What was rendered before a truncated or malformed response has
+            # already advanced last_when & the dedup cache, so must be sent:
+            await self.put_events(events, feed_state)
+            raise
+        if not events and feed_state.get("last_placemark") is last_placemark:
+            # No new points, so keep the latest one from going stale:
+            await self.refresh_feed(feed_conf, feed_state)
+            return None
+        await self.put_events(events, feed_state)
+
+    def render_chunk(
+        self,
+        placemarks: Iterable[Optional[Placemark]],
+        feed_conf: dict,
+        feed_state: dict,
+        last_when: Optional[datetime.datetime] = None,
+    ) -> list:
+        """Render the Placemarks parsed from one chunk of a response.
+
+        The whole chunk is parsed before any of it is rendered, so a parse
+        error doesn't leave points rendered, but never sent.
+        """
+        start: float = time.perf_counter()
+        parsed: list = list(placemarks)
+        parse_time: float = time.perf_counter() - start
+        self.metrics.inc("inrcot_parse_seconds_total", parse_time)
+        self.add_timing(feed_state, "parse", parse_time)
+        if not parsed:
+            return []
+        return self.render_placemarks(parsed, feed_conf, last_when)
+
+    def render_placemarks(
+        self,
+        placemarks: Iterable[Optional[Placemark]],
+        feed_conf: dict,
+        last_when: Optional[datetime.datetime] = None,
+    ) -> list:
+        """Render inReach Placemarks as CoT Events."""
+        feed_state: dict = self.feed_state.setdefault(feed_conf.get("feed_name"), {})
+        cot_template: CoTTemplate = self.get_cot_template(feed_conf)
+        placemark_filter: Optional[PlacemarkFilter] = self.placemark_filter
+        track_mode: Optional[str] = feed_conf.get("track_mode")
+        since: Optional[float] = None
+        if self.incremental_poll and last_when:
+            since = last_when.timestamp()
+        events: list = []
+        newest: Optional[Placemark] = None
+        latest: Optional[Placemark] = None
+        refresh_after: float = self.dedup_refresh_after(feed_conf)
+
+        start: float = time.perf_counter()
+        parse_time: list = [0.0]
+        for placemark in self._timed(placemarks, parse_time):
+            if placemark is None:
                 self._logger.debug("Empty CoT Event")
                 continue
-            await self.put_queue(event)
 
-    async def get_inreach_feeds(self) -> None:
-        """Get inReach Feed from API."""
-        for feed_conf in self.inreach_feeds:
-            feed_auth = feed_conf.get("feed_auth")
-            if not feed_auth:
-                self._logger.warning("No feed_auth specified.")
-                continue
+            if self.incremental_poll:
+                when = placemark.when
+                if last_when and when <= last_when:
+                    self._logger.debug("Skipping already seen point: %s", when)
+                    continue
+                if not feed_state.get("last_when") or when > feed_state["last_when"]:
+                    feed_state["last_when"] = when
+
+            if newest is None or placemark.when > newest.when:
+                newest = placemark
 
-            feed_url = feed_conf.get("feed_url")
-            if not feed_url:
-                self._logger.warning("No feed_url specified.")
+            if placemark_filter is not None and not placemark_filter.matches(placemark):
+                self._logger.debug("Skipping filtered point: %s", placemark)
+                self.counters["filtered"] += 1
                 continue
 
-            async with aiohttp.ClientSession() as session:
-                try:
-                    response = await session.request(
-                        method="GET", auth=feed_auth, url=feed_url
-                    )
-                except Exception as exc:  # NOQA pylint: disable=broad-except
-                    self._logger.warning("Exception raised while polling inReach API.")
-                    self._logger.exception(exc)
+            # The latest point & its track are filtered by position separately,
+            # so a unit's track inside the area is sent even if it's since left:
+            in_area: bool = placemark_filter is None or placemark_filter.contains(
+                placemark.lat, placemark.lon
+            )
+            if in_area:
+                if latest is None or placemark.when > latest.when:
+                    latest = placemark
+                if self.is_duplicate(cot_template, placemark, refresh_after):
                     continue
 
-                status: int = response.status
-                if status != 200:
-                    self._logger.warning(
-                        "No valid response from inReach API: status=%s", status
+            if track_mode and placemark.track is not None:
+                track_since: Optional[float] = since
+                if track_mode == "points":
+                    # Only send track points newer than those already sent,
+                    # whether or not INCREMENTAL_POLL is on:
+                    track_sent: Optional[float] = feed_state.get("track_sent")
+                    if track_sent is not None and (
+                        track_since is None or track_sent > track_since
+                    ):
+                        track_since = track_sent
+                indices: list = inrcot.decimate_track(
+                    placemark.track,
+                    feed_conf.get("track_tolerance", inrcot.DEFAULT_TRACK_TOLERANCE),
+                    feed_conf.get(
+                        "track_min_interval", inrcot.DEFAULT_TRACK_MIN_INTERVAL
+                    ),
+                    track_since,
+                    (
+                        placemark_filter.contains
+                        if placemark_filter is not None and placemark_filter.has_area
+                        else None
+                    ),
+                )
+                if track_mode == "points" and indices:
+                    feed_state["track_sent"] = max(
+                        placemark.track.epochs[indices[-1]],
+                        feed_state.get("track_sent") or 0,
                     )
-                    self._logger.debug(response)
-                    continue
+                events.extend(
+                    cot_template.render_track(
+                        placemark, placemark.track, indices, track_mode
+                    )
+                )
+
+            if not in_area:
+                self._logger.debug("Skipping filtered point: %s", placemark)
+                self.counters["filtered"] += 1
+                continue
+
+            events.append(cot_template.render(placemark))
+
+        if newest is not None:
+            self.update_activity(feed_state, newest)
+        # Kept to re-send with a fresh stale when the feed is Not Modified:
+        last_placemark: Optional[Placemark] = feed_state.get("last_placemark")
+        if latest is not None and (
+            last_placemark is None or latest.when >= last_placemark.when
+        ):
+            feed_state["last_placemark"] = latest
+
+        render_time: float = time.perf_counter() - start - parse_time[0]
+        self.metrics.inc("inrcot_parse_seconds_total", parse_time[0])
+        self.metrics.inc("inrcot_render_seconds_total", render_time)
+        self.add_timing(feed_state, "parse", parse_time[0])
+        self.add_timing(feed_state, "render", render_time)
+        if events:
+            self.metrics.inc(
+                "inrcot_events_total", len(events), feed=feed_conf.get("feed_name")
+            )
+        return events
+
+    def dedup_refresh_after(self, feed_conf: dict) -> float:
+        """Get how long until an unchanged point of a feed's is sent again."""
+        if self.dedup_cache is None:
+            return 0
+        return (
+            self.dedup_refresh
+            * inrcot.get_render_context(feed_conf).cot_stale.total_seconds()
+        )
+
+    def is_duplicate(
+        self, cot_template: CoTTemplate, placemark: Placemark, refresh_after: float
+    ) -> bool:
+        """Check if a point was sent unchanged recently, remembering it if not."""
+        if self.dedup_cache is None:
+            return False
+        uid: str = cot_template.uid(placemark)
+        key: tuple = (placemark.time, placemark.lat, placemark.lon)
+        if self.dedup_cache.is_fresh(uid, key, refresh_after):
+            self._logger.debug("Skipping unchanged point: %s", uid)
+            self.counters["deduplicated"] += 1
+            return True
+        self.dedup_cache.add(uid, key)
+        return False
+
+    async def refresh_feed(self, feed_conf: dict, feed_state: dict) -> None:
+        """Re-send a feed's latest point with a fresh stale, if it's unchanged.
+
+        Without this, a parked unit's CoT would go stale on TAK clients, as a
+        feed that is Not Modified, or has no new points, has nothing to render.
+        """
+        placemark: Optional[Placemark] = feed_state.get("last_placemark")
+        if placemark is None:
+            return None
+        cot_template: CoTTemplate = self.get_cot_template(feed_conf)
+        if self.is_duplicate(
+            cot_template, placemark, self.dedup_refresh_after(feed_conf)
+        ):
+            return None
+        await self.put_events([cot_template.render(placemark)], feed_state)
+
+    @staticmethod
+    def _timed(iterable: Iterable, timer: list) -> Iterator:
+        """Iterate, adding the time spent waiting on `iterable` to `timer[0]`."""
+        iterator: Iterator = iter(iterable)
+        while 1:
+            start: float = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                timer[0] += time.perf_counter() - start
+                return
+            timer[0] += time.perf_counter() - start
+            yield item
+
+    def update_activity(self, feed_state: dict, placemark: Placemark) -> None:
+        """Mark a feed as active if its latest point is recent or has moved."""
+        age: float = (
+            datetime.datetime.now(datetime.timezone.utc) - placemark.when
+        ).total_seconds()
+        last_position: Optional[tuple] = feed_state.get("last_position")
+        moved: bool = last_position is None or (
+            inrcot.distance(
+                last_position[0], last_position[1], placemark.lat, placemark.lon
+            )
+            > self.poll_active_distance
+        )
+        feed_state["last_position"] = (placemark.lat, placemark.lon)
+        feed_state["active"] = moved or age < self.poll_active_age
+
+    async def put_events(self, events: list, feed_state: Optional[dict] = None) -> None:
+        """Put one poll's CoT Events on the TX queue, batched if enabled."""
+        start: float = time.perf_counter()
+        if not self.batch_events:
+            for event in events:
+                await self.put_output(event)
+        else:
+            for batch in inrcot.batch_events(events, self.max_batch_size):
+                await self.put_output(batch)
+        if feed_state is not None:
+            self.add_timing(feed_state, "queue", time.perf_counter() - start)
+
+    async def put_output(self, data: bytes) -> None:
+        """Put rendered CoT on the TX queue, and on every sink's queue."""
+        self.count_dropped()
+        await self.put_queue(data)
+        for sink in self.sinks:
+            await sink.put(data)
+
+    def count_dropped(self) -> None:
+        """Count the TX queue item about to be dropped, if the queue is full."""
+        if self.queue.full():
+            self.counters["dropped"] += 1
+
+    async def get_inreach_feed(self, feed_conf: dict) -> bool:
+        """Get a single inReach Feed from API, returning False on errors.
+
+        Feeds whose circuit breaker is open are skipped until it half-opens.
+        """
+        feed_url = feed_conf.get("feed_url")
+        if not feed_url:
+            self._logger.warning("No feed_url specified.")
+            return False
+
+        feed_name: Optional[str] = feed_conf.get("feed_name")
+        feed_state: dict = self.feed_state.setdefault(feed_name, {})
+        if feed_state.get("circuit") == "open":
+            if time.monotonic() < feed_state.get("circuit_open_until", 0):
+                return False
+            feed_state["circuit"] = "half-open"
+            self._logger.info("Circuit half-open, retrying feed: %s", feed_name)
+
+        if self.slow_poll > 0:
+            feed_state["timings"] = {"start": time.perf_counter()}
+        success: bool = await self._get_inreach_feed(feed_conf, feed_state)
+        if "timings" in feed_state:
+            self.record_timings(feed_name, feed_state)
+        if success:
+            self.record_success(feed_name, feed_state)
+            if self.state_store is not None:
+                try:
+                    await self.state_store.save(feed_name, feed_state)
+                except sqlite3.Error as exc:
+                    self._logger.warning("Unable to save feed state: %s", exc)
+        else:
+            self.record_failure(feed_name, feed_state)
+        return success
 
-                await self.handle_data(await response.content.read(), feed_conf)
+    def record_success(self, feed_name: Optional[str], feed_state: dict) -> None:
+        """Reset a feed's failure count, closing its circuit breaker."""
+        if feed_state.get("circuit") not in (None, "closed"):
+            self._logger.info("Circuit closed, feed recovered: %s", feed_name)
+        feed_state["failures"] = 0
+        feed_state["circuit"] = "closed"
+
+    def record_failure(self, feed_name: Optional[str], feed_state: dict) -> None:
+        """Count a failed poll, opening the feed's circuit breaker if need be."""
+        failures: int = feed_state.get("failures", 0) + 1
+        feed_state["failures"] = failures
+        if failures < self.circuit_breaker_failures:
+            return None
+        if feed_state.get("circuit") != "open":
+            self._logger.warning(
+                "Circuit open after %s failures, pausing feed for %ss: %s",
+                failures,
+                self.circuit_breaker_timeout,
+                feed_name,
+            )
+        feed_state["circuit"] = "open"
+        feed_state["circuit_open_until"] = time.monotonic() + max(
+            self.circuit_breaker_timeout, feed_state.get("retry_after") or 0
+        )
+
+    def _log_poll_failure(self, feed_state: dict, msg: str, *args) -> None:
+        """Log a failed poll, quietly if the feed is already known to be failing."""
+        if feed_state.get("circuit", "closed") == "closed":
+            self._logger.warning(msg, *args)
+        else:
+            self._logger.debug(msg, *args)
+
+    async def _get_inreach_feed(self, feed_conf: dict, feed_state: dict) -> bool:
+        feed_url = feed_conf.get("feed_url")
+        feed_state["active"] = False
+        feed_state["retry_after"] = None
+        since: Optional[datetime.datetime] = None
+        if self.incremental_poll:
+            since = feed_state.get("last_when")
+        if not since and feed_conf.get("track_mode"):
+            since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+                hours=feed_conf.get("track_window", inrcot.DEFAULT_TRACK_WINDOW)
+            )
+        params: dict = inrcot.make_feed_params(since)
+        # Only make a conditional GET if there's a point to re-send on a 304,
+        # eg not after a restart with a STATE_FILE that has no point saved:
+        headers: dict = inrcot.make_feed_headers(
+            feed_conf, feed_state if "last_placemark" in feed_state else None
+        )
+
+        session: aiohttp.ClientSession = await self.get_session()
+        async with self._poll_semaphore:
+            start: float = time.perf_counter()
+            # ok, not_modified, http_error, timeout or error:
+            outcome: str = "error"
+            try:
+                async with session.get(
+                    feed_url, params=params, headers=headers
+                ) as response:
+                    status: int = response.status
+                    self.metrics.inc("inrcot_http_responses_total", status=status)
+                    if status == 304:
+                        self.counters["not_modified"] += 1
+                        self._logger.debug("Feed not modified: %s", feed_url)
+                        await self.refresh_feed(feed_conf, feed_state)
+                        outcome = "not_modified"
+                        return True
+                    if status != 200:
+                        outcome = "http_error"
+                        self._log_poll_failure(
+                            feed_state,
+                            "No valid response from inReach API: status=%s",
+                            status,
+                        )
+                        self._logger.debug(response)
+                        if status in (429, 503):
+                            feed_state["retry_after"] = inrcot.parse_retry_after(
+                                response.headers.get("Retry-After")
+                            )
+                        return False
+                    await self.handle_response(response, feed_conf)
+                    feed_state["etag"] = response.headers.get("ETag")
+                    feed_state["last_modified"] = response.headers.get("Last-Modified")
+                    outcome = "ok"
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                self._log_poll_failure(
+                    feed_state, "Timed out polling inReach API: %s", feed_url
+                )
+                return False
+            except Exception as exc:  # NOQA pylint: disable=broad-except
+                self._log_poll_failure(
+                    feed_state, "Exception raised while polling inReach API: %s", exc
+                )
+                self._logger.debug(exc, exc_info=True)
+                return False
+            finally:
+                self.metrics.observe(
+                    "inrcot_poll_duration_seconds",
+                    time.perf_counter() - start,
+                    feed=feed_conf.get("feed_name"),
+                    outcome=outcome,
+                )
+        return True
+
+    async def get_inreach_feeds(self) -> None:
+        """Get all inReach Feeds from API, concurrently."""
+        await asyncio.gather(
+            *[self.get_inreach_feed(feed_conf) for feed_conf in self.inreach_feeds]
+        )
+        self.report_slow_polls()
+
+    def next_poll_interval(self, feed_state: dict, success: bool) -> float:
+        """Get how long until a feed should next be polled, with jitter.
+
+        Active feeds are polled every POLL_INTERVAL_MIN seconds, and idle feeds
+        back off by POLL_BACKOFF each poll, up to POLL_INTERVAL_MAX seconds.
+        Failing feeds back off exponentially from POLL_INTERVAL, up to
+        RETRY_INTERVAL_MAX seconds, or longer if their circuit breaker is open
+        or the server sent a Retry-After.
+        """
+        interval: float = feed_state.get("interval", self.poll_interval)
+        if not success:
+            interval = min(
+                self.poll_interval * self.poll_backoff ** feed_state.get("failures", 1),
+                self.retry_interval_max,
+            )
+            if feed_state.get("circuit") == "open":
+                interval = max(
+                    interval, feed_state["circuit_open_until"] - time.monotonic()
+                )
+            interval = max(interval, feed_state.get("retry_after") or 0)
+        elif feed_state.get("active"):
+            interval = self.poll_interval_min
+        else:
+            interval = min(interval * self.poll_backoff, self.poll_interval_max)
+        interval = max(interval, self.poll_interval_min)
+        feed_state["interval"] = interval
+        return inrcot.jitter(interval, self.poll_jitter)
+
+    async def poll_feed(self, feed_name: str) -> None:
+        """Poll a feed, then schedule its next poll."""
+        feed_conf: Optional[dict] = self._feeds_by_name.get(feed_name)
+        if feed_conf is None:
+            return None
+        success: bool = await self.get_inreach_feed(feed_conf)
+        feed_state: dict = self.feed_state.setdefault(feed_name, {})
+        interval: float = self.next_poll_interval(feed_state, success)
+        self._logger.debug("Next poll of %s in %.1fs", feed_name, interval)
+        self.scheduler.schedule(feed_name, interval)
 
     async def run(self, number_of_iterations=-1) -> None:
         """Run this Worker, Reads from Pollers."""
         self._logger.info("Run: %s", self.__class__)
 
-        poll_interval: int = int(
-            self.config.get("POLL_INTERVAL", inrcot.DEFAULT_POLL_INTERVAL)
-        )
+        await self.load_state()
+        await self.start_metrics_server()
+        self.install_profile_signal()
 
-        while 1:
-            await self.get_inreach_feeds()
-            await asyncio.sleep(poll_interval)
+        # Spread the first polls out, so feeds don't all hit MapShare at once:
+        for feed_name in self._feeds_by_name:
+            self.scheduler.schedule(
+                feed_name, random.uniform(0, self.poll_jitter * self.poll_interval)
+            )
+
+        tasks: set = set()
+        if self.loop_lag_interval > 0:
+            tasks.add(asyncio.ensure_future(self.monitor_loop_lag()))
+        if self.feed_roster and self.roster_reload_interval > 0:
+            tasks.add(asyncio.ensure_future(self.watch_roster()))
+        if self.slow_poll > 0:
+            tasks.add(asyncio.ensure_future(self.monitor_slow_polls()))
+        try:
+            while 1:
+                for feed_name in await self.scheduler.wait_due():
+                    task = asyncio.ensure_future(self.poll_feed(feed_name))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.close()
@@ -20,15 +20,22 @@ import argparse
 import asyncio
 import importlib
 import logging
+import multiprocessing
 import os
 import platform
 import pprint
+import signal
 import sys
+import time
 import warnings
 
 from configparser import ConfigParser, SectionProxy
+from typing import Optional
 
-import pytak
+# For --profile-startup, from before the (slow) third party imports:
+STARTED: float = time.perf_counter()
+
+import pytak  # NOQA pylint: disable=wrong-import-position
 
 # Python 3.6 support:
 if sys.version_info[:2] >= (3, 7):
@@ -43,7 +50,10 @@ __license__ = "Apache License, Version 2.0"
 
 
 async def main(
-    app_name: str, config: SectionProxy, original_config: ConfigParser
+    app_name: str,
+    config: SectionProxy,
+    original_config: ConfigParser,
+    profile: Optional[list] = None,
 ) -> None:
     """
     Abstract implementation of an async main function.
@@ -54,15 +64,61 @@ async def main(
         Name of the app calling this function.
     config : `SectionProxy`
         A dict of configuration parameters & values.
+    profile : `list`
+        If given, (stage, seconds) startup timings to add to & report.
     """
-    app = importlib.__import__(app_name)
+    app = importlib.import_module(app_name)
+    mark: float = time.perf_counter()
     clitool: pytak.CLITool = pytak.CLITool(config)
-    create_tasks = getattr(app, "create_tasks")
     await clitool.setup()
-    clitool.add_tasks(create_tasks(config, clitool, original_config))
+    if profile is not None:
+        profile.append(("pytak setup", time.perf_counter() - mark))
+        mark = time.perf_counter()
+    clitool.add_tasks(app.create_tasks(config, clitool, original_config))
+    if profile is not None:
+        profile.append((f"{app_name} tasks", time.perf_counter() - mark))
+        report_startup(profile)
     await clitool.run()
 
 
+def report_startup(profile: list) -> None:
+    """Print how long each startup stage took, to stderr."""
+    total: float = time.perf_counter() - STARTED
+    print(f"Startup profile ({os.getpid()}):", file=sys.stderr)
+    for stage, seconds in profile:
+        print(f"  {stage:20} {seconds * 1e3:8.1f} ms", file=sys.stderr)
+    print(f"  {'total':20} {total * 1e3:8.1f} ms", file=sys.stderr)
+
+
+def make_config(
+    app, app_name: str, config_file: Optional[str], env_vars: dict
+) -> ConfigParser:
+    """
+    Read the config file, then fill in the app's section from the environment.
+
+    Environment variables only apply to the app's section, below the config
+    file, and aren't seeded as defaults of every section.
+    """
+    orig_config: ConfigParser = ConfigParser(
+        {"COT_STALE": getattr(app, "DEFAULT_COT_STALE", pytak.DEFAULT_COT_STALE)}
+    )
+
+    if config_file and os.path.exists(config_file):
+        logging.info("Reading configuration from %s", config_file)
+        orig_config.read(config_file)
+    if not orig_config.has_section(app_name):
+        orig_config.add_section(app_name)
+
+    config: SectionProxy = orig_config[app_name]
+    env_vars.setdefault("COT_URL", pytak.DEFAULT_COT_URL)
+    env_vars["COT_HOST_ID"] = f"{app_name}@{platform.node()}"
+    for key, val in env_vars.items():
+        # Skip env vars that contain '%', which ConfigParser or pprint barf on:
+        if "%" not in val and not orig_config.has_option(app_name, key):
+            config[key] = val
+    return orig_config
+
+
 def cli(app_name: str = "inrcot") -> None:
     """
     Abstract implementation of a Command Line Interface (CLI).
@@ -72,7 +128,9 @@ def cli(app_name: str = "inrcot") -> None:
     app_name : `str`
         Name of the app calling this function.
     """
-    app = importlib.__import__(app_name)
+    profile: list = [("imports", time.perf_counter() - STARTED)]
+    mark: float = time.perf_counter()
+    app = importlib.import_module(app_name)
 
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -91,28 +149,20 @@ def cli(app_name: str = "inrcot") -> None:
         type=str,
         help="Optional connection preferences package zip file (aka data package).",
     )
+    parser.add_argument(
+        "--profile-startup",
+        dest="PROFILE_STARTUP",
+        action="store_true",
+        help="Report how long importing, configuring & setting up took.",
+    )
     namespace = parser.parse_args()
     cli_args = {k: v for k, v in vars(namespace).items() if v is not None}
 
     # Read config:
-    env_vars = os.environ
-
-    # Remove env vars that contain '%', which ConfigParser or pprint barf on:
-    env_vars = {key: val for key, val in env_vars.items() if "%" not in val}
-
-    env_vars["COT_URL"] = env_vars.get("COT_URL", pytak.DEFAULT_COT_URL)
-    env_vars["COT_HOST_ID"] = f"{app_name}@{platform.node()}"
-    env_vars["COT_STALE"] = getattr(app, "DEFAULT_COT_STALE", pytak.DEFAULT_COT_STALE)
-
-    orig_config: ConfigParser = ConfigParser(env_vars)
-
     config_file = cli_args.get("CONFIG_FILE")
-    if config_file and os.path.exists(config_file):
-        logging.info("Reading configuration from %s", config_file)
-        orig_config.read(config_file)
-    else:
-        orig_config.add_section(app_name)
-
+    orig_config: ConfigParser = make_config(
+        app, app_name, config_file, dict(os.environ)
+    )
     config: SectionProxy = orig_config[app_name]
 
     pref_package: str = config.get("PREF_PACKAGE", cli_args.get("PREF_PACKAGE"))
@@ -127,11 +177,104 @@ def cli(app_name: str = "inrcot") -> None:
         pprint.pprint(dict(config))
         print("=" * 10)
 
+    profile.append(("config", time.perf_counter() - mark))
+    if not cli_args.get("PROFILE_STARTUP"):
+        profile = None
+
+    shards: int = int(config.get("SHARDS") or 1)
+    if shards > 1:
+        run_shards(app_name, orig_config, shards, debug, profile)
+    else:
+        run_main(app_name, config, orig_config, debug, profile)
+
+
+def run_main(
+    app_name: str,
+    config: SectionProxy,
+    orig_config: ConfigParser,
+    debug: bool = False,
+    profile: Optional[list] = None,
+) -> None:
+    """Run the async main function until it completes."""
     if sys.version_info[:2] >= (3, 7):
-        asyncio.run(main(app_name, config, orig_config), debug=debug)
+        asyncio.run(main(app_name, config, orig_config, profile), debug=debug)
     else:
         loop = get_running_loop()
         try:
-            loop.run_until_complete(main(app_name, config, orig_config))
+            loop.run_until_complete(main(app_name, config, orig_config, profile))
         finally:
             loop.close()
+
+
+def run_shard(
+    app_name: str,
+    orig_config: ConfigParser,
+    shard: int,
+    debug: bool = False,
+    profile: Optional[list] = None,
+) -> None:
+    """Run one shard's main function, polling only that shard's feeds."""
+    config: SectionProxy = orig_config[app_name]
+    config["SHARD"] = str(shard)
+    try:
+        run_main(app_name, config, orig_config, debug, profile)
+    except KeyboardInterrupt:
+        pass
+
+
+def run_shards(
+    app_name: str,
+    orig_config: ConfigParser,
+    shards: int,
+    debug: bool = False,
+    profile: Optional[list] = None,
+) -> None:
+    """
+    Run `shards` processes, each polling its own share of the feeds.
+
+    Each process renders its feeds' CoT and sends it over its own connection
+    to COT_URL. The processes are terminated on SIGINT or SIGTERM.
+    """
+    logging.info("Starting %s shard processes.", shards)
+    processes: list = [
+        multiprocessing.Process(
+            target=run_shard,
+            args=(app_name, orig_config, shard, debug, profile),
+            name=f"{app_name}-shard-{shard}",
+        )
+        for shard in range(shards)
+    ]
+    parent_pid: int = os.getpid()
+    terminated: list = []
+
+    def terminate_shards(signum, _frame) -> None:
+        if os.getpid() != parent_pid:
+            # A forked shard inherits this handler, so dies as SIGTERM would:
+            signal.signal(signum, signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
+            return
+        terminated.append(signum)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    previous_handler = signal.signal(signal.SIGTERM, terminate_shards)
+    try:
+        for process in processes:
+            process.start()
+        if terminated:
+            # Also terminate any shards started after the SIGTERM:
+            terminate_shards(terminated[0], None)
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            if process.pid is not None:
+                process.join()
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+    if terminated:
+        raise SystemExit(128 + terminated[0])
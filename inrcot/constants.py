@@ -29,3 +29,126 @@ DEFAULT_COT_STALE: str = "600"
 
 # Default CoT type. 'a-f-g-e-s' works in iTAK, WinTAK & ATAK...
 DEFAULT_COT_TYPE: str = "a-f-g-e-s"
+
+# How many feeds may be polled at the same time?
+DEFAULT_MAX_CONCURRENT_POLLS: int = 10
+
+# How long to wait for a single feed request before giving up (seconds)
+DEFAULT_POLL_TIMEOUT: int = 30
+
+# Total number of simultaneous connections in the shared HTTP connection pool
+DEFAULT_CONNECTION_LIMIT: int = 100
+
+# Simultaneous connections to the same host (share.garmin.com), 0 = no limit
+DEFAULT_CONNECTION_LIMIT_PER_HOST: int = 0
+
+# How long to keep idle connections open for reuse (seconds)
+DEFAULT_KEEPALIVE_TIMEOUT: int = 60
+
+# How long to cache DNS lookups (seconds)
+DEFAULT_DNS_CACHE_TTL: int = 300
+
+# Only ask MapShare for, and only send, points newer than the last one seen?
+DEFAULT_INCREMENTAL_POLL: bool = False
+
+# KML XML Namespace, as used by inReach MapShare feeds
+KML_NS: str = "{http://www.opengis.net/kml/2.2}"
+
+# KML TimeStamp 'when' format, as used by inReach MapShare feeds
+KML_WHEN_FORMAT: str = "%Y-%m-%dT%H:%M:%SZ"
+
+# How many bytes of a feed response to read & parse at a time
+READ_CHUNK_SIZE: int = 65536
+
+# Put all of a poll's CoT Events on the TX queue as one batch, for one write?
+DEFAULT_BATCH_EVENTS: bool = False
+
+# Largest batch of CoT Events to write at once (bytes), 0 = no limit
+DEFAULT_MAX_BATCH_SIZE: int = 0
+
+# Track modes: send every (decimated) point of a feed's track, or one route
+TRACK_MODES: tuple = ("points", "route")
+
+# Drop track points within this distance of the simplified track (meters)
+DEFAULT_TRACK_TOLERANCE: float = 25.0
+
+# Drop track points less than this long after the last point kept (seconds)
+DEFAULT_TRACK_MIN_INTERVAL: float = 0.0
+
+# How far back to request track history from MapShare (hours)
+DEFAULT_TRACK_WINDOW: float = 24.0
+
+# Idle or erroring feeds are polled this many times less often each poll
+DEFAULT_POLL_BACKOFF: float = 2.0
+
+# Randomly spread each feed's poll interval by up to +/- this fraction
+DEFAULT_POLL_JITTER: float = 0.1
+
+# A feed is active if its latest point moved further than this (meters)...
+DEFAULT_POLL_ACTIVE_DISTANCE: float = 50.0
+
+# ...or is more recent than this (seconds)
+DEFAULT_POLL_ACTIVE_AGE: float = 900.0
+
+# Failing feeds back off exponentially, up to this long between polls (seconds)
+DEFAULT_RETRY_INTERVAL_MAX: float = 3600.0
+
+# Stop polling a feed after this many failures in a row...
+DEFAULT_CIRCUIT_BREAKER_FAILURES: int = 5
+
+# ...for this long, before trying it again (seconds)
+DEFAULT_CIRCUIT_BREAKER_TIMEOUT: float = 1800.0
+
+# Suppress CoT Events for units whose position & time haven't changed
+DEFAULT_DEDUP_EVENTS: bool = False
+
+# Remember the last Event sent for up to this many units...
+DEFAULT_DEDUP_CACHE_SIZE: int = 10000
+
+# ...for up to this long (seconds)
+DEFAULT_DEDUP_CACHE_TTL: float = 3600.0
+
+# Re-send unchanged Events after this fraction of COT_STALE, 0 to never re-send
+DEFAULT_DEDUP_REFRESH: float = 0.5
+
+# Serve metrics on this address, when METRICS_PORT is set
+DEFAULT_METRICS_ADDR: str = "127.0.0.1"
+
+# Upper bounds of the metrics' latency histogram buckets (seconds)
+METRICS_BUCKETS: tuple = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Parse large feeds in a 'thread' or 'process' pool, instead of on the event loop
+DEFAULT_PARSE_EXECUTOR: str = ""
+
+# Only feeds of at least this many bytes are parsed in the PARSE_EXECUTOR
+DEFAULT_PARSE_OFFLOAD_SIZE: int = 262144
+
+# How often to measure event loop lag, 0 to not measure it (seconds)
+DEFAULT_LOOP_LAG_INTERVAL: float = 0.5
+
+# How often to check FEED_ROSTER for changes, 0 to never reload it (seconds)
+DEFAULT_ROSTER_RELOAD_INTERVAL: float = 30.0
+
+# Log polls that take longer than this, with a per-stage breakdown, 0 to not (seconds)
+DEFAULT_SLOW_POLL: float = 0
+
+# How many of the slowest feeds to list in each slow poll report
+SLOW_POLL_REPORT_SIZE: int = 5
+
+# Add altitude, speed & course from ExtendedData to each Event
+DEFAULT_COT_DETAIL: bool = False
+
+# CoT point hae, ce & le value meaning 'unknown'
+COT_UNKNOWN: str = "9999999.0"
+
+# How many CoT Events each output sink queues, waiting to be sent
+DEFAULT_SINK_QUEUE_SIZE: int = 1000
+
+# What a sink does when its queue is full: drop its oldest or the newest Event...
+DEFAULT_SINK_OVERFLOW: str = "drop_oldest"
+
+# ...or 'block' until there's room, holding up polling
+SINK_OVERFLOW_POLICIES: tuple = ("drop_oldest", "drop_newest", "block")
+
+# How long a sink waits before reconnecting to its COT_URL (seconds)
+DEFAULT_SINK_RECONNECT_INTERVAL: float = 10.0
@@ -17,11 +17,22 @@
 """INRCOT Gateway Functions."""
 
 import datetime
+import email.utils
 import io
+import json
+import math
+import os
+import random
+import re
 import xml.etree.ElementTree as ET
+import zlib
+
+from array import array
+
+from xml.sax.saxutils import escape
 
 from configparser import ConfigParser
-from typing import Optional, Set
+from typing import Callable, Optional, Sequence, Set, Union
 
 from aiohttp import BasicAuth
 
@@ -51,7 +62,40 @@ def create_tasks(
     `set`
         Set of PyTAK Worker classes for this application.
     """
-    return set([inrcot.Worker(clitool.tx_queue, config, original_config)])
+    worker: inrcot.Worker = inrcot.Worker(clitool.tx_queue, config, original_config)
+    return set([worker] + worker.sinks)
+
+
+def batch_events(events: list, max_size: int = 0) -> list:
+    """Join CoT Events into as few batches as possible, for one write each.
+
+    If max_size is set, batches are kept at or under max_size bytes. Events
+    that are larger than max_size on their own are sent in a batch of one.
+    """
+    if not max_size:
+        return [b"".join(events)] if events else []
+
+    batches: list = []
+    batch: list = []
+    batch_size: int = 0
+    for event in events:
+        if batch and batch_size + len(event) > max_size:
+            batches.append(b"".join(batch))
+            batch = []
+            batch_size = 0
+        batch.append(event)
+        batch_size += len(event)
+    if batch:
+        batches.append(b"".join(batch))
+    return batches
+
+
+def getboolean(config, option: str, fallback: bool = False) -> bool:
+    """Get a boolean option from a config SectionProxy or dict."""
+    value = config.get(option)
+    if value is None:
+        return fallback
+    return str(value).lower() in pytak.BOOLEAN_TRUTH
 
 
 def split_feed(content: bytes) -> Optional[list]:
@@ -64,6 +108,64 @@ def split_feed(content: bytes) -> Optional[list]:
     return folder
 
 
+# Match ElementTree's attribute escaping, so rendered CoT is byte-identical:
+XML_ATTRIB_ENTITIES: dict = {'"': "&quot;", "\r": "&#13;", "\n": "&#10;", "\t": "&#09;"}
+
+
+def escape_attrib(text: str) -> str:
+    """Escape a string for use as an XML attribute value."""
+    return escape(text, XML_ATTRIB_ENTITIES)
+
+
+def escape_text(text: str) -> str:
+    """Escape a string for use as XML character data."""
+    return escape(text)
+
+
+def parse_when(when: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse a KML TimeStamp 'when' value as a timezone-aware UTC datetime."""
+    if not when:
+        return None
+    try:
+        return datetime.datetime.strptime(when.strip(), inrcot.KML_WHEN_FORMAT).replace(
+            tzinfo=datetime.timezone.utc
+        )
+    except ValueError:
+        return None
+
+
+def make_feed_params(last_when: Optional[datetime.datetime]) -> dict:
+    """Make MapShare query parameters asking only for points after last_when.
+
+    MapShare's 'd1' start date only has minute resolution, so the window is
+    rounded down & points at or before last_when must still be skipped.
+    """
+    if not last_when:
+        return {}
+    return {
+        "d1": last_when.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%Mz")
+    }
+
+
+def make_feed_headers(feed_conf: dict, feed_state: Optional[dict] = None) -> dict:
+    """Make HTTP request headers for a feed, including conditional GET validators."""
+    feed_state = feed_state or {}
+    headers: dict = dict(feed_conf.get("feed_headers") or {})
+    etag: Optional[str] = feed_state.get("etag")
+    if etag:
+        headers["If-None-Match"] = etag
+    last_modified: Optional[str] = feed_state.get("last_modified")
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def make_track_mode(track_mode: Optional[str]) -> Optional[str]:
+    """Normalize a TRACK_MODE setting: 'points', 'route', or None for off."""
+    track_mode = (track_mode or "").strip().lower()
+    return track_mode if track_mode in inrcot.TRACK_MODES else None
+
+
 def make_feed_conf(section) -> dict:
     """Make a feed conf dictionary from a conf."""
     feed_conf: dict = {
@@ -72,6 +174,15 @@ def make_feed_conf(section) -> dict:
         "cot_type": section.get("COT_TYPE", inrcot.DEFAULT_COT_TYPE),
         "cot_icon": section.get("COT_ICON"),
         "cot_name": section.get("COT_NAME"),
+        "cot_detail": getboolean(section, "COT_DETAIL", inrcot.DEFAULT_COT_DETAIL),
+        "track_mode": make_track_mode(section.get("TRACK_MODE")),
+        "track_tolerance": float(
+            section.get("TRACK_TOLERANCE", inrcot.DEFAULT_TRACK_TOLERANCE)
+        ),
+        "track_min_interval": float(
+            section.get("TRACK_MIN_INTERVAL", inrcot.DEFAULT_TRACK_MIN_INTERVAL)
+        ),
+        "track_window": float(section.get("TRACK_WINDOW", inrcot.DEFAULT_TRACK_WINDOW)),
     }
     # Support "private" MapShare feeds:
     feed_pass: str = section.get("FEED_PASSWORD")
@@ -79,90 +190,656 @@ def make_feed_conf(section) -> dict:
     if feed_pass and feed_user:
         feed_auth: BasicAuth = BasicAuth(feed_user, feed_pass)
         feed_conf["feed_auth"] = str(feed_auth)
+        feed_conf["feed_headers"] = {"Authorization": feed_auth.encode()}
 
     return feed_conf
 
 
-def create_feeds(config: ConfigParser) -> list:
-    """Create a list of feed configurations."""
+def read_roster(path: str) -> tuple:
+    """Read a CSV, JSON or YAML roster file into (defaults, feed entries).
+
+    JSON & YAML rosters are either a list of feeds, or a mapping with a list
+    of 'feeds' and a mapping of 'defaults' shared by them. CSV rosters have a
+    header row of config params, and one feed per row. Raises ValueError if
+    the roster can't be parsed.
+    """
+    ext: str = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8", newline="") as roster_fd:
+        if ext == ".csv":
+            import csv  # NOQA pylint: disable=import-outside-toplevel
+
+            try:
+                return {}, list(csv.DictReader(roster_fd))
+            except csv.Error as exc:
+                raise ValueError(f"Invalid CSV roster: {path}: {exc}") from exc
+        if ext == ".json":
+            roster = json.load(roster_fd)
+        elif ext in (".yaml", ".yml"):
+            try:
+                import yaml  # NOQA pylint: disable=import-outside-toplevel
+            except ImportError as exc:
+                raise ValueError(
+                    "YAML rosters need PyYAML: python3 -m pip install inrcot[with_yaml]"
+                ) from exc
+            try:
+                roster = yaml.safe_load(roster_fd)
+            except yaml.YAMLError as exc:
+                raise ValueError(f"Invalid YAML roster: {path}: {exc}") from exc
+        else:
+            raise ValueError(f"Unsupported roster format, not CSV/JSON/YAML: {path}")
+
+    if isinstance(roster, list):
+        return {}, roster
+    if isinstance(roster, dict):
+        return roster.get("defaults") or {}, roster.get("feeds") or []
+    raise ValueError(f"Roster is neither a list nor a mapping of feeds: {path}")
+
+
+def _roster_section(entry: dict) -> dict:
+    """Make a roster entry look like a feed config section: upper case & str."""
+    return {
+        str(key).strip().upper(): str(val).strip()
+        for key, val in entry.items()
+        if key is not None and val is not None and str(val).strip() != ""
+    }
+
+
+def load_roster(path: str, shard: int = 0, shards: int = 1) -> list:
+    """Load & validate feed configurations in bulk from a roster file.
+
+    Each feed's params override the roster's defaults. Feeds are named by
+    their FEED_NAME, or else their FEED_URL. With more than one shard, only
+    the feeds belonging to `shard` are created. Raises ValueError if any feed
+    is invalid.
+    """
+    defaults, entries = read_roster(path)
+    if not isinstance(defaults, dict):
+        raise ValueError(f"{path}: defaults isn't a mapping")
+    defaults = _roster_section(defaults)
+    feeds: list = []
+    names: set = set()
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"{path}: feed {number} isn't a mapping")
+        section: dict = dict(defaults)
+        section.update(_roster_section(entry))
+        feed_url: str = section.get("FEED_URL", "")
+        if not feed_url.startswith(("http://", "https://")):
+            raise ValueError(f"{path}: feed {number} has no valid FEED_URL")
+        feed_name: str = section.get("FEED_NAME") or feed_url
+        if feed_name in names:
+            raise ValueError(f"{path}: feed {number} is a duplicate: {feed_name}")
+        names.add(feed_name)
+        if shards > 1 and shard_for(feed_name, shards) != shard:
+            continue
+        try:
+            feed_conf: dict = make_feed_conf(section)
+            feed_conf["feed_name"] = feed_name
+            feed_conf["render_context"] = make_render_context(feed_conf)
+        except ValueError as exc:
+            raise ValueError(f"{path}: feed {number}: {exc}") from exc
+        feeds.append(feed_conf)
+    return feeds
+
+
+def make_cot_names(name: Optional[str]) -> tuple:
+    """Make the name dependent CoT values for a unit: uid, callsign & remarks."""
+    return (
+        f"Garmin-inReach.{name}".replace(" ", ""),
+        f"{name} (inReach)",
+        f"Garmin inReach User.\r\n Name: {name}",
+    )
+
+
+def make_render_context(feed_conf: Optional[dict] = None) -> "inrcot.RenderContext":
+    """Compile a feed conf into the static values needed to render its CoT."""
+    feed_conf = feed_conf or {}
+
+    cot_name: Optional[str] = feed_conf.get("cot_name")
+    cot_icon: Optional[str] = feed_conf.get("cot_icon")
+    usericon: Optional[ET.Element] = None
+    if cot_icon:
+        usericon = ET.Element("usericon")
+        usericon.set("iconsetpath", cot_icon)
+
+    return inrcot.RenderContext(
+        cot_type=feed_conf.get("cot_type", inrcot.DEFAULT_COT_TYPE),
+        cot_stale=datetime.timedelta(
+            seconds=int(feed_conf.get("cot_stale", inrcot.DEFAULT_COT_STALE))
+        ),
+        cot_icon=cot_icon,
+        usericon=usericon,
+        names=make_cot_names(cot_name) if cot_name else None,
+        detail=bool(feed_conf.get("cot_detail")),
+        track_window=datetime.timedelta(
+            hours=float(feed_conf.get("track_window", inrcot.DEFAULT_TRACK_WINDOW))
+        ),
+    )
+
+
+def make_point_detail(placemark: "inrcot.Placemark") -> tuple:
+    """Get a Placemark's CoT point hae & track (speed, course) values.
+
+    An unknown hae is `inrcot.COT_UNKNOWN`, unknown track values None. Points
+    without a valid GPS fix are sent with no altitude. MapShare's altitude is
+    above mean sea level, not the WGS84 ellipsoid as CoT's hae should be, so
+    may be off by the local geoid height (up to ~100 m). MapShare gives no
+    accuracy, so ce & le are always unknown.
+    """
+    hae: str = inrcot.COT_UNKNOWN
+    if placemark.alt is not None and placemark.valid_fix is not False:
+        hae = str(placemark.alt)
+    # CoT speed is in meters/second, MapShare's Velocity in km/h:
+    speed: Optional[str] = None
+    if placemark.velocity is not None:
+        speed = str(round(placemark.velocity / 3.6, 2))
+    course: Optional[str] = None
+    if placemark.course is not None:
+        course = str(placemark.course)
+    return (hae, speed, course)
+
+
+def get_render_context(feed_conf: Optional[dict] = None) -> "inrcot.RenderContext":
+    """Get a feed's precompiled render context, compiling one if needed."""
+    feed_conf = feed_conf or {}
+    return feed_conf.get("render_context") or make_render_context(feed_conf)
+
+
+def shard_for(feed_name: str, shards: int) -> int:
+    """Get the shard a feed belongs to, stably across processes & restarts."""
+    return zlib.crc32(feed_name.encode("utf-8")) % max(shards, 1)
+
+
+def create_feeds(config: ConfigParser, shard: int = 0, shards: int = 1) -> list:
+    """Create a list of feed configurations.
+
+    With more than one shard, only the feeds belonging to `shard` are created.
+    """
     feeds: list = []
     for feed in config.sections():
         if not "inrcot_feed_" in feed:
             continue
+        if shards > 1 and shard_for(feed, shards) != shard:
+            continue
         config_section = config[feed]
         feed_conf: dict = make_feed_conf(config_section)
         feed_conf["feed_name"] = feed
+        feed_conf["render_context"] = make_render_context(feed_conf)
         feeds.append(feed_conf)
     return feeds
 
 
-def inreach_to_cot_xml(
-    feed: str, feed_conf: Optional[dict] = None
-) -> Optional[ET.Element]:
-    """Convert an inReach Response to a Cursor-on-Target Event, as an XML Obj."""
-    feed_conf = feed_conf or {}
+def create_sinks(config: ConfigParser, app_config=None) -> list:
+    """Create an output Sink for each inrcot_sink_* section in a config.
+
+    Sinks inherit the app's config (eg TLS & TAK_PROTO params), overridden by
+    their own section.
+    """
+    sinks: list = []
+    for sink in config.sections():
+        if not sink.startswith("inrcot_sink_"):
+            continue
+        if not config[sink].get("COT_URL"):
+            raise ValueError(f"No COT_URL for sink: {sink}")
+        sink_config: ConfigParser = ConfigParser(interpolation=None)
+        sink_config.read_dict({sink: dict(app_config or {})})
+        sink_config.read_dict({sink: dict(config[sink])})
+        sinks.append(inrcot.Sink(sink, sink_config[sink]))
+    return sinks
 
-    placemarks = feed.find("{http://www.opengis.net/kml/2.2}Placemark")
-    _point = placemarks.find("{http://www.opengis.net/kml/2.2}Point")
-    coordinates = _point.find("{http://www.opengis.net/kml/2.2}coordinates").text
-    _name = placemarks.find("{http://www.opengis.net/kml/2.2}name").text
 
-    ts = placemarks.find("{http://www.opengis.net/kml/2.2}TimeStamp")
-    when = ts.find("{http://www.opengis.net/kml/2.2}when").text
+KML_WHEN: str = f"{inrcot.KML_NS}TimeStamp/{inrcot.KML_NS}when"
 
-    if not "," in coordinates or coordinates.count(",") != 2:
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    """Parse the leading number from an ExtendedData value, eg '0.0 km/h'."""
+    if not value:
+        return None
+    try:
+        return float(value.split()[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def _parse_bool(value: Optional[str]) -> Optional[bool]:
+    """Parse an ExtendedData 'True' / 'False' value."""
+    if not value:
+        return None
+    return value.strip().lower() == "true"
+
+
+# ExtendedData fields kept on a Placemark: Data name -> (attribute, parser)
+EXTENDED_DATA_FIELDS: dict = {
+    "IMEI": ("imei", None),
+    "Device Type": ("device_type", None),
+    "Velocity": ("velocity", _parse_number),
+    "Course": ("course", _parse_number),
+    "Valid GPS Fix": ("valid_fix", _parse_bool),
+    "In Emergency": ("in_emergency", _parse_bool),
+    "Text": ("text", None),
+    "Event": ("event", None),
+}
+
+
+# Placemark attributes FILTER_ATTRIBUTES predicates can test:
+FILTER_ATTRIBUTES: frozenset = frozenset(
+    ("name", "alt") + tuple(attr for attr, _ in EXTENDED_DATA_FIELDS.values())
+)
+
+# Numeric Placemark attributes, which '>' and '<' predicates can compare:
+FILTER_NUMERIC_ATTRIBUTES: frozenset = frozenset(
+    ("alt",)
+    + tuple(
+        attr
+        for attr, parser in EXTENDED_DATA_FIELDS.values()
+        if parser is _parse_number
+    )
+)
+
+# 'attr', an operator, then the value(s) to compare to:
+FILTER_PREDICATE = re.compile(r"^\s*(\w+)\s*(!=|=|>|<)\s*(.*?)\s*$")
+
+
+def parse_placemark(feed: ET.Element) -> Optional["inrcot.Placemark"]:
+    """Parse the latest Placemark in an inReach 'Folder' into a Placemark record.
+
+    Returns None if the position or TimeStamp is missing or malformed.
+    """
+    placemarks: list = feed.findall(f"{inrcot.KML_NS}Placemark")
+    if not placemarks:
+        return None
+
+    # Feeds requested with a 'd1' start date have one Placemark per point,
+    # oldest first. ISO 8601 UTC timestamps sort the same as strings:
+    placemark: ET.Element = placemarks[0]
+    if len(placemarks) > 1:
+        latest: str = ""
+        for _placemark in placemarks:
+            when: str = _placemark.findtext(KML_WHEN) or ""
+            if when > latest:
+                latest = when
+                placemark = _placemark
+
+    return _parse_placemark(placemark)
+
+
+def _parse_placemark(placemark: ET.Element) -> Optional["inrcot.Placemark"]:
+    """Parse a KML Placemark, walking its children once instead of a find() each."""
+    name: Optional[str] = None
+    time: Optional[str] = None
+    coordinates: Optional[str] = None
+    extended: dict = {}
+
+    for child in placemark:
+        tag = child.tag
+        if tag == f"{inrcot.KML_NS}name":
+            name = child.text
+        elif tag == f"{inrcot.KML_NS}TimeStamp":
+            time = child.findtext(f"{inrcot.KML_NS}when")
+        elif tag == f"{inrcot.KML_NS}Point":
+            coordinates = child.findtext(f"{inrcot.KML_NS}coordinates")
+        elif tag == f"{inrcot.KML_NS}ExtendedData":
+            for data in child:
+                field = EXTENDED_DATA_FIELDS.get(data.get("name"))
+                if not field:
+                    continue
+                attr, parser = field
+                value = data.findtext(f"{inrcot.KML_NS}value")
+                extended[attr] = parser(value) if parser else value
+
+    if not coordinates or coordinates.count(",") != 2:
         return None
 
     lon, lat, alt = coordinates.split(",")
     if not all([lat, lon]):
         return None
 
-    time = when
+    when: Optional[datetime.datetime] = parse_when(time)
+    if not when:
+        return None
+
+    try:
+        return inrcot.Placemark(
+            name=name,
+            lat=float(lat),
+            lon=float(lon),
+            alt=float(alt) if alt.strip() else None,
+            when=when,
+            time=time.strip(),
+            **extended,
+        )
+    except ValueError:
+        return None
+
+
+def parse_track(feed: ET.Element) -> Optional["inrcot.Track"]:
+    """Parse every point in an inReach 'Folder' into a Track of arrays.
+
+    Only each point's TimeStamp & coordinates are read. The track log
+    LineString is skipped, as it repeats the points without timestamps.
+    """
+    times: list = []
+    epochs: array = array("d")
+    lats: array = array("d")
+    lons: array = array("d")
+
+    for placemark in feed.iterfind(f"{inrcot.KML_NS}Placemark"):
+        time: Optional[str] = None
+        coordinates: Optional[str] = None
+        for child in placemark:
+            if child.tag == f"{inrcot.KML_NS}TimeStamp":
+                time = child.findtext(f"{inrcot.KML_NS}when")
+            elif child.tag == f"{inrcot.KML_NS}Point":
+                coordinates = child.findtext(f"{inrcot.KML_NS}coordinates")
+        if not time or not coordinates or coordinates.count(",") != 2:
+            continue
+        lon, lat, _ = coordinates.split(",")
+        when: Optional[datetime.datetime] = parse_when(time)
+        if not when or not lat or not lon:
+            continue
+        try:
+            point: tuple = (float(lat), float(lon))
+        except ValueError:
+            continue
+        lats.append(point[0])
+        lons.append(point[1])
+        times.append(time.strip())
+        epochs.append(when.timestamp())
+
+    if not epochs:
+        return None
+
+    if any(epochs[i] > epochs[i + 1] for i in range(len(epochs) - 1)):
+        order: list = sorted(range(len(epochs)), key=epochs.__getitem__)
+        times = [times[i] for i in order]
+        epochs = array("d", [epochs[i] for i in order])
+        lats = array("d", [lats[i] for i in order])
+        lons = array("d", [lons[i] for i in order])
+
+    return inrcot.Track(times=times, epochs=epochs, lats=lats, lons=lons)
+
+
+def parse_feed(data: bytes, track: bool = False) -> list:
+    """Parse every 'Folder' of an inReach KML feed into a Placemark (or None).
+
+    Picklable in & out, so it can be run in a process pool.
+    """
+    placemarks: list = []
+    for feed in split_feed(data) or []:
+        placemark: Optional["inrcot.Placemark"] = parse_placemark(feed)
+        if placemark is not None and track:
+            placemark.track = parse_track(feed)
+        placemarks.append(placemark)
+    return placemarks
+
+
+def douglas_peucker(xs: Sequence, ys: Sequence, tolerance: float) -> list:
+    """Simplify a line with the Ramer-Douglas-Peucker algorithm.
+
+    Returns the indices of the points to keep, always including the first
+    and last points.
+    """
+    count: int = len(xs)
+    if count < 3 or tolerance <= 0:
+        return list(range(count))
+
+    keep: list = [False] * count
+    keep[0] = keep[-1] = True
+    stack: list = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        x1, y1, x2, y2 = xs[start], ys[start], xs[end], ys[end]
+        dx, dy = x2 - x1, y2 - y1
+        norm: float = math.hypot(dx, dy)
+        max_dist: float = 0.0
+        index: int = start
+        for i in range(start + 1, end):
+            if norm:
+                dist = abs(dy * xs[i] - dx * ys[i] + x2 * y1 - y2 * x1) / norm
+            else:
+                dist = math.hypot(xs[i] - x1, ys[i] - y1)
+            if dist > max_dist:
+                max_dist = dist
+                index = i
+        if max_dist > tolerance:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+
+    return [i for i in range(count) if keep[i]]
+
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Get the great-circle distance between two points, in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi: float = phi2 - phi1
+    dlambda: float = math.radians(lon2 - lon1)
+    hav: float = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * 6371008.8 * math.asin(math.sqrt(min(hav, 1.0)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse an HTTP Retry-After header, in seconds or as a date, into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at: datetime.datetime = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(
+        (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0
+    )
+
+
+def parse_bbox(value: str) -> tuple:
+    """Parse a 'south,west,north,east' bounding box, in decimal degrees."""
+    try:
+        south, west, north, east = [float(edge) for edge in value.split(",")]
+    except ValueError as exc:
+        raise ValueError(f"Invalid FILTER_BBOX: {value!r}") from exc
+    if south > north:
+        raise ValueError(f"Invalid FILTER_BBOX, south is north of north: {value!r}")
+    return (south, west, north, east)
+
+
+def parse_polygon(value: str) -> list:
+    """Parse a 'lat,lon lat,lon lat,lon ...' polygon, in decimal degrees."""
+    try:
+        points: list = [
+            tuple(float(coord) for coord in point.split(",")) for point in value.split()
+        ]
+    except ValueError as exc:
+        raise ValueError(f"Invalid FILTER_POLYGON: {value!r}") from exc
+    if len(points) < 3 or any(len(point) != 2 for point in points):
+        raise ValueError(f"Invalid FILTER_POLYGON, need 3+ lat,lon points: {value!r}")
+    return points
+
+
+def _filter_value(value) -> str:
+    """Normalize a Placemark attribute for comparing to FILTER_ATTRIBUTES values."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return ""
+    return str(value).strip().lower()
+
+
+def parse_predicate(value: str) -> tuple:
+    """Parse an 'attr=a|b', 'attr!=a|b', 'attr>n' or 'attr<n' predicate.
+
+    Returns (attr, test), where test(placemark_value) is True for a match.
+    """
+    match = FILTER_PREDICATE.match(value)
+    if not match or match.group(1) not in FILTER_ATTRIBUTES:
+        raise ValueError(f"Invalid FILTER_ATTRIBUTES predicate: {value!r}")
+    attr, operator, operand = match.groups()
+
+    if operator in ("=", "!="):
+        values: frozenset = frozenset(
+            _filter_value(option) for option in operand.split("|")
+        )
+        if operator == "=":
+            return (attr, lambda _value: _filter_value(_value) in values)
+        return (attr, lambda _value: _filter_value(_value) not in values)
+
+    if attr not in FILTER_NUMERIC_ATTRIBUTES:
+        raise ValueError(
+            f"Invalid FILTER_ATTRIBUTES predicate: {value!r} "
+            f"({attr} is not numeric, use = or !=)"
+        )
+    try:
+        number: float = float(operand)
+    except ValueError as exc:
+        raise ValueError(f"Invalid FILTER_ATTRIBUTES predicate: {value!r}") from exc
+    if operator == ">":
+        return (attr, lambda _value: _value is not None and _value > number)
+    return (attr, lambda _value: _value is not None and _value < number)
+
+
+def make_placemark_filter(config) -> Optional["inrcot.PlacemarkFilter"]:
+    """Make the filter Placemarks must pass to be rendered, or None if unset."""
+    bbox: Optional[str] = config.get("FILTER_BBOX")
+    polygon: Optional[str] = config.get("FILTER_POLYGON")
+    attributes: Optional[str] = config.get("FILTER_ATTRIBUTES")
+    if not (bbox or polygon or attributes):
+        return None
+    return inrcot.PlacemarkFilter(
+        bbox=parse_bbox(bbox) if bbox else None,
+        geofence=inrcot.Geofence(parse_polygon(polygon)) if polygon else None,
+        predicates=[
+            parse_predicate(predicate)
+            for predicate in (attributes or "").split(";")
+            if predicate.strip()
+        ],
+    )
+
+
+def jitter(interval: float, fraction: float) -> float:
+    """Randomly spread an interval by up to +/- fraction of itself."""
+    if fraction <= 0:
+        return interval
+    return interval * random.uniform(1 - fraction, 1 + fraction)
+
+
+def decimate_track(
+    track: "inrcot.Track",
+    tolerance: float = 0,
+    min_interval: float = 0,
+    since: Optional[float] = None,
+    area: Optional[Callable[[float, float], bool]] = None,
+) -> list:
+    """Decimate a Track, returning the indices of the points to keep.
+
+    Points at or before `since` (a POSIX timestamp), or for which `area(lat,
+    lon)` is False, are dropped. Points less than `min_interval` seconds after
+    the last kept point are dropped. What's left is simplified with
+    Douglas-Peucker, to within `tolerance` meters.
+    """
+    epochs: array = track.epochs
+    indices: list = [
+        i for i in range(len(epochs)) if since is None or epochs[i] > since
+    ]
+    if area is not None:
+        indices = [i for i in indices if area(track.lats[i], track.lons[i])]
+    if not indices:
+        return indices
+
+    if min_interval > 0:
+        last: int = indices[-1]
+        kept: list = []
+        last_epoch: Optional[float] = None
+        for i in indices:
+            if last_epoch is None or epochs[i] - last_epoch >= min_interval:
+                kept.append(i)
+                last_epoch = epochs[i]
+        if kept[-1] != last:
+            kept.append(last)
+        indices = kept
+
+    if tolerance > 0 and len(indices) > 2:
+        # Equirectangular projection to meters, plenty accurate over a track:
+        lats: list = [track.lats[i] for i in indices]
+        scale: float = math.cos(math.radians(sum(lats) / len(lats))) * 111320.0
+        xs: list = [track.lons[i] * scale for i in indices]
+        ys: list = [lat * 110540.0 for lat in lats]
+        indices = [indices[i] for i in douglas_peucker(xs, ys, tolerance)]
+
+    return indices
+
+
+def inreach_to_cot_xml(
+    feed: Union[ET.Element, "inrcot.Placemark"], feed_conf: Optional[dict] = None
+) -> Optional[ET.Element]:
+    """Convert an inReach Response to a Cursor-on-Target Event, as an XML Obj.
+
+    `feed` may be an inReach KML 'Folder', or a Placemark already parsed from one.
+    """
+    if isinstance(feed, ET.Element):
+        placemark: Optional[inrcot.Placemark] = parse_placemark(feed)
+    else:
+        placemark = feed
+    if placemark is None:
+        return None
+
+    render_context: inrcot.RenderContext = get_render_context(feed_conf)
+    time: str = placemark.time
 
     # We want to use localtime + stale instead of lastUpdate time + stale
     # This means a device could go offline and we might not know it?
-    _cot_stale = feed_conf.get("cot_stale", inrcot.DEFAULT_COT_STALE)
     cot_stale = (
-        datetime.datetime.now(datetime.timezone.utc)
-        + datetime.timedelta(seconds=int(_cot_stale))
+        datetime.datetime.now(datetime.timezone.utc) + render_context.cot_stale
     ).strftime(pytak.ISO_8601_UTC)
 
-    cot_type = feed_conf.get("cot_type", inrcot.DEFAULT_COT_TYPE)
+    uid, callsign, _remarks = render_context.names or make_cot_names(placemark.name)
 
-    name = feed_conf.get("cot_name") or _name
-    callsign = name
+    hae: str = inrcot.COT_UNKNOWN
+    speed: Optional[str] = None
+    course: Optional[str] = None
+    if render_context.detail:
+        hae, speed, course = make_point_detail(placemark)
 
     point = ET.Element("point")
-    point.set("lat", str(lat))
-    point.set("lon", str(lon))
-    point.set("hae", "9999999.0")
-    point.set("ce", "9999999.0")
-    point.set("le", "9999999.0")
+    point.set("lat", str(placemark.lat))
+    point.set("lon", str(placemark.lon))
+    point.set("hae", hae)
+    point.set("ce", inrcot.COT_UNKNOWN)
+    point.set("le", inrcot.COT_UNKNOWN)
 
     contact = ET.Element("contact")
-    contact.set("callsign", f"{callsign} (inReach)")
+    contact.set("callsign", callsign)
 
     detail = ET.Element("detail")
     detail.append(contact)
 
     remarks = ET.Element("remarks")
 
-    _remarks = f"Garmin inReach User.\r\n Name: {name}"
-
     detail.set("remarks", _remarks)
     remarks.text = _remarks
     detail.append(remarks)
 
-    cot_icon: Optional[str] = feed_conf.get("cot_icon")
-    if cot_icon:
-        usericon = ET.Element("usericon")
-        usericon.set("iconsetpath", cot_icon)
-        detail.append(usericon)
+    if speed is not None or course is not None:
+        track = ET.Element("track")
+        if speed is not None:
+            track.set("speed", speed)
+        if course is not None:
+            track.set("course", course)
+        detail.append(track)
+
+    if render_context.usericon is not None:
+        detail.append(render_context.usericon)
 
     root = ET.Element("event")
     root.set("version", "2.0")
-    root.set("type", cot_type)
-    root.set("uid", f"Garmin-inReach.{name}".replace(" ", ""))
+    root.set("type", render_context.cot_type)
+    root.set("uid", uid)
     root.set("how", "m-g")
     root.set("time", time)  # .strftime(pytak.ISO_8601_UTC))
     root.set("start", time)  # .strftime(pytak.ISO_8601_UTC))
@@ -173,7 +850,12 @@ def inreach_to_cot_xml(
     return root
 
 
-def inreach_to_cot(content: str, feed_conf: Optional[dict] = None) -> Optional[bytes]:
-    """Render a CoT XML as a string."""
+def inreach_to_cot(
+    content: Union[ET.Element, "inrcot.Placemark"], feed_conf: Optional[dict] = None
+) -> Optional[bytes]:
+    """Render a CoT XML as a string.
+
+    See also `inrcot.CoTTemplate`, which renders the same bytes much faster.
+    """
     cot: Optional[ET.Element] = inreach_to_cot_xml(content, feed_conf)
     return ET.tostring(cot) if cot else None
@@ -71,6 +71,7 @@ setuptools.setup(
     zip_safe=False,
     include_package_data=True,
     install_requires=["pytak >= 5.6.1", "aiohttp"],
+    extras_require={"with_yaml": ["pyyaml"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache Software License",
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""inReach to Cursor-on-Target Gateway Load Test Tests."""
+
+import os
+import sys
+
+import pytest
+
+from aiohttp.test_utils import make_mocked_request
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks")
+)
+import load_test  # NOQA pylint: disable=wrong-import-position
+import mock_mapshare  # NOQA pylint: disable=wrong-import-position
+
+__author__ = "Greg Albrecht <oss@undef.net>"
+__copyright__ = "Copyright 2023 Greg Albrecht"
+__license__ = "Apache License, Version 2.0"
+
+
+@pytest.mark.asyncio
+class TestLoadTest:
+    """Test the load test against its MockMapShare."""
+
+    @pytest.mark.parametrize(
+        "options,responses",
+        [
+            # The second cycle's conditional GETs all match the mock's ETags:
+            ([], {200: 20, 304: 20}),
+            (["--username", "user", "--password", "pass"], {200: 20, 304: 20}),
+            (["--no-etag"], {200: 40}),
+            # d1 trims the second cycle's feeds to their latest point, so their
+            # ETags no longer match:
+            (["--points", "5", "--config", "INCREMENTAL_POLL", "true"], {200: 40}),
+            (["--error-rate", "1"], {503: 40}),
+        ],
+    )
+    async def test_load_test(self, options, responses):
+        """Test a load test polls every feed, each cycle."""
+        args = load_test.make_parser().parse_args(
+            ["--feeds", "20", "--cycles", "2"] + options
+        )
+        mock = await load_test.load_test(args)
+        assert mock.requests == 40
+        assert mock.responses == responses
+
+    async def test_auth(self):
+        """Test the mock turns away requests without its basic auth."""
+        mock = mock_mapshare.MockMapShare(username="user", password="pass")
+        request = make_mocked_request("GET", "/Feed/Share/0", match_info={"feed": "0"})
+        response = await mock.handle_feed(request)
+        assert response.status == 401
+        assert mock.responses == {401: 1}
+
+
+def test_make_feed():
+    """Test the mock only serves the points after d1."""
+    mock = mock_mapshare.MockMapShare(points=5)
+    assert mock.make_feed("0").count(b"<when>") == 5
+    assert mock.make_feed("0", "2000-01-01T00:00z").count(b"<when>") == 5
+    assert mock.make_feed("0", "2999-01-01T00:00z").count(b"<when>") == 0
@@ -0,0 +1,1174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""inReach to Cursor-on-Target Gateway Class Tests."""
+
+import asyncio
+import concurrent.futures
+import contextlib
+import datetime
+import itertools
+import logging
+import os
+import pstats
+import re
+import signal
+import socket
+import sqlite3
+import tempfile
+import time
+import unittest
+import xml.etree.ElementTree as ET
+
+from array import array
+from typing import Iterator, List, Optional
+
+from configparser import ConfigParser
+
+import aiohttp
+import pytest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import inrcot.classes
+import inrcot.functions
+
+__author__ = "Greg Albrecht <oss@undef.net>"
+__copyright__ = "Copyright 2023 Greg Albrecht"
+__license__ = "Apache License, Version 2.0"
+
+# Python 3.6 support (pytest-asyncio < 0.17 runs async fixtures itself):
+try:
+    from pytest_asyncio import fixture as async_fixture
+except ImportError:
+    async_fixture = pytest.fixture
+
+
+def repeat_folders(content: bytes, count: int) -> bytes:
+    """Make a KML feed with `count` copies of the first Folder in content."""
+    start = content.index(b"<Folder>")
+    end = content.index(b"</Folder>") + len(b"</Folder>")
+    return content[:start] + content[start:end] * count + content[end:]
+
+
+def make_config(
+    base_url: str, feeds: int = 1, feed_config: Optional[dict] = None, **kwargs
+) -> ConfigParser:
+    """Make a Worker config with `feeds` feed sections pointing at base_url."""
+    orig_config: ConfigParser = ConfigParser()
+    orig_config.add_section("inrcot")
+    for key, val in kwargs.items():
+        orig_config["inrcot"][key] = str(val)
+    for feed in range(feeds):
+        section: str = f"inrcot_feed_{feed}"
+        orig_config.add_section(section)
+        orig_config[section]["FEED_URL"] = f"{base_url}/Feed/Share/{feed}"
+        for key, val in (feed_config or {}).items():
+            orig_config[section][key] = str(val)
+    return orig_config
+
+
+@contextlib.contextmanager
+def capture_logs(logger: logging.Logger, level: int) -> Iterator[List[str]]:
+    """Collect the messages logged at `level` or above by logger."""
+    records: List[str] = []
+    handler = logging.Handler(level)
+    handler.emit = lambda record: records.append(record.getMessage())
+    logger.addHandler(handler)
+    try:
+        yield records
+    finally:
+        logger.removeHandler(handler)
+
+
+class CoTTemplateTestCase(unittest.TestCase):
+    """Test for inrcot CoTTemplate."""
+
+    @staticmethod
+    def strip_stale(event: bytes) -> bytes:
+        """Remove the stale time, which is relative to now."""
+        return re.sub(rb'stale="[^"]*"', b'stale=""', event)
+
+    def test_render_parity(self):
+        """Test the template renders the same bytes as inreach_to_cot."""
+        with open("tests/data/test.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+        test_kml = inrcot.functions.split_feed(test_kml_feed)[0]
+        placemark = inrcot.functions.parse_placemark(test_kml)
+
+        test_config_file = "tests/data/test-config.ini"
+        orig_config: ConfigParser = ConfigParser()
+        orig_config.read(test_config_file)
+        feed_confs = inrcot.functions.create_feeds(orig_config) + [
+            {},
+            {"cot_name": 'Fish & "Chips" <Team>\t\n', "cot_icon": "a&b/c.png"},
+            {"cot_name": "Zoë Ñandú 🛰", "cot_type": "a-f-G"},
+            {"cot_detail": True, "cot_icon": "a.png"},
+        ]
+        names = [placemark.name, None, "O'Brien & Sons <SAR>"]
+        # (alt, velocity, course, valid_fix):
+        details = [
+            (22.63, 0.0, 0.0, True),
+            (None, 12.5, None, None),
+            (0, None, 90, False),
+        ]
+
+        for feed_conf in feed_confs:
+            cot_template = inrcot.classes.CoTTemplate(feed_conf)
+            for name, detail in itertools.product(names, details):
+                placemark.name = name
+                placemark.alt, placemark.velocity, placemark.course = detail[:3]
+                placemark.valid_fix = detail[3]
+                with self.subTest(feed_conf=feed_conf, name=name, detail=detail):
+                    self.assertEqual(
+                        self.strip_stale(cot_template.render(placemark)),
+                        self.strip_stale(
+                            inrcot.functions.inreach_to_cot(placemark, feed_conf)
+                        ),
+                    )
+
+    def test_render_detail(self):
+        """Test COT_DETAIL sends altitude, speed & course, but no made up accuracy."""
+        with open("tests/data/test.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+        placemark = inrcot.functions.parse_placemark(
+            inrcot.functions.split_feed(test_kml_feed)[0]
+        )
+        placemark.velocity = 36.0
+        placemark.course = 271.5
+
+        event = ET.fromstring(
+            inrcot.classes.CoTTemplate({"cot_detail": True}).render(placemark)
+        )
+        point = event.find("point")
+        self.assertEqual(point.get("hae"), "22.63")
+        self.assertEqual(point.get("ce"), inrcot.COT_UNKNOWN)
+        self.assertEqual(point.get("le"), inrcot.COT_UNKNOWN)
+        track = event.find("detail/track")
+        self.assertEqual(track.get("speed"), "10.0")
+        self.assertEqual(track.get("course"), "271.5")
+
+        event = ET.fromstring(inrcot.classes.CoTTemplate({}).render(placemark))
+        self.assertEqual(event.find("point").get("hae"), inrcot.COT_UNKNOWN)
+        self.assertIsNone(event.find("detail/track"))
+
+    def test_render_stale(self):
+        """Test the rendered stale time honors COT_STALE."""
+        with open("tests/data/test.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+        test_kml = inrcot.functions.split_feed(test_kml_feed)[0]
+        placemark = inrcot.functions.parse_placemark(test_kml)
+
+        event = ET.fromstring(
+            inrcot.classes.CoTTemplate({"cot_stale": "60"}).render(placemark)
+        )
+        stale = datetime.datetime.strptime(
+            event.get("stale"), "%Y-%m-%dT%H:%M:%S.%fZ"
+        ).replace(tzinfo=datetime.timezone.utc)
+        delta = stale - datetime.datetime.now(datetime.timezone.utc)
+        self.assertAlmostEqual(delta.total_seconds(), 60, delta=5)
+
+    def test_render_track_stale(self):
+        """Test track points stay until they leave the TRACK_WINDOW."""
+        with open("tests/data/test.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+        placemark = inrcot.functions.parse_placemark(
+            inrcot.functions.split_feed(test_kml_feed)[0]
+        )
+        now = time.time()
+        # An hour old, 2 hours old & (older than the window) 2 days old:
+        epochs = [now - 3600, now - 7200, now - 172800]
+        track = inrcot.classes.Track(
+            [str(epoch) for epoch in epochs],
+            array("d", epochs),
+            array("d", [1.0, 2.0, 3.0]),
+            array("d", [4.0, 5.0, 6.0]),
+        )
+        cot_template = inrcot.classes.CoTTemplate(
+            {"cot_stale": "600", "track_window": 24}
+        )
+        events = [
+            ET.fromstring(event)
+            for event in cot_template.render_track(
+                placemark, track, [0, 1, 2], "points"
+            )
+        ]
+        stales = [
+            datetime.datetime.strptime(event.get("stale"), "%Y-%m-%dT%H:%M:%S.%fZ")
+            .replace(tzinfo=datetime.timezone.utc)
+            .timestamp()
+            for event in events
+        ]
+        self.assertAlmostEqual(stales[0], now + 23 * 3600, delta=5)
+        self.assertAlmostEqual(stales[1], now + 22 * 3600, delta=5)
+        self.assertAlmostEqual(stales[2], now + 600, delta=5)
+
+
+class KMLFeedParserTestCase(unittest.TestCase):
+    """Test for inrcot KMLFeedParser."""
+
+    def parse(self, content: bytes, chunk_size: int = 100) -> list:
+        """Parse content in chunks, rendering each Folder as it is yielded."""
+        parser = inrcot.classes.KMLFeedParser()
+        events: list = []
+        for offset in range(0, len(content), chunk_size):
+            for folder in parser.feed(content[offset : offset + chunk_size]):
+                events.append(inrcot.functions.inreach_to_cot(folder, {}))
+        for folder in parser.close():
+            events.append(inrcot.functions.inreach_to_cot(folder, {}))
+        self.assertFalse(parser._document.findall(f"{inrcot.KML_NS}Folder"))
+        return events
+
+    def test_parse(self):
+        """Test streaming inReach KML one Folder at a time."""
+        with open("tests/data/test.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+
+        events = self.parse(test_kml_feed)
+        self.assertEqual(len(events), 1)
+        self.assertIn(b"Greg Albrecht (inReach)", events[0])
+
+    def test_parse_many_folders(self):
+        """Test streaming a feed with many Folders."""
+        with open("tests/data/test.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+
+        content = repeat_folders(test_kml_feed, 50)
+        events = self.parse(content, chunk_size=4096)
+        self.assertEqual(len(events), 50)
+
+    def test_parse_bad_kml(self):
+        """Test streaming KML without the KML namespace yields nothing."""
+        with open("tests/data/bad.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+
+        parser = inrcot.classes.KMLFeedParser()
+        self.assertEqual(list(parser.feed(test_kml_feed)) + list(parser.close()), [])
+
+
+@pytest.mark.asyncio
+class TestPollScheduler:
+    """Test for inrcot PollScheduler."""
+
+    async def test_wait_due(self):
+        """Test keys come due in order of their due time."""
+        scheduler = inrcot.classes.PollScheduler()
+        scheduler.schedule("b", 0.1)
+        scheduler.schedule("a", 0)
+        scheduler.schedule("c", 0.2)
+        assert await scheduler.wait_due() == ["a"]
+        assert await scheduler.wait_due() == ["b"]
+        assert await scheduler.wait_due() == ["c"]
+        assert len(scheduler) == 0
+
+    async def test_wait_due_wakeup(self):
+        """Test a waiting scheduler wakes up for a newly scheduled key."""
+        scheduler = inrcot.classes.PollScheduler()
+        scheduler.schedule("slow", 10)
+        waiter = asyncio.ensure_future(scheduler.wait_due())
+        await asyncio.sleep(0.01)
+        scheduler.schedule("fast", 0.01)
+        assert await asyncio.wait_for(waiter, 1) == ["fast"]
+
+
+class EventCacheTestCase(unittest.TestCase):
+    """Test for inrcot EventCache."""
+
+    def test_is_fresh(self):
+        """Test unchanged keys are fresh until refreshed or changed."""
+        cache = inrcot.EventCache()
+        self.assertFalse(cache.is_fresh("uid", (1, 2)))
+        cache.add("uid", (1, 2))
+        self.assertTrue(cache.is_fresh("uid", (1, 2)))
+        self.assertTrue(cache.is_fresh("uid", (1, 2), 60))
+        self.assertFalse(cache.is_fresh("uid", (1, 3)))
+        time.sleep(0.02)
+        self.assertFalse(cache.is_fresh("uid", (1, 2), 0.01))
+
+    def test_ttl(self):
+        """Test entries expire after the cache's TTL."""
+        cache = inrcot.EventCache(ttl=0.01)
+        cache.add("uid", (1, 2))
+        time.sleep(0.02)
+        self.assertFalse(cache.is_fresh("uid", (1, 2)))
+        self.assertEqual(len(cache), 0)
+
+    def test_lru(self):
+        """Test the least recently used uids are evicted first."""
+        cache = inrcot.EventCache(max_size=2)
+        cache.add("a", 1)
+        cache.add("b", 1)
+        cache.is_fresh("a", 1)
+        cache.add("c", 1)
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.is_fresh("a", 1))
+        self.assertFalse(cache.is_fresh("b", 1))
+
+
+@pytest.mark.asyncio
+class TestStateStore:
+    """Test for inrcot StateStore."""
+
+    async def test_save_load(self):
+        """Test feed state survives a save, close & reload."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "state.db")
+            when = datetime.datetime(2021, 1, 1, 12, tzinfo=datetime.timezone.utc)
+            placemark = inrcot.Placemark(
+                "Unit", 1.5, 2.5, 10.0, when, "2021-01-01T12:00:00Z"
+            )
+            store = inrcot.StateStore(path)
+            await store.save(
+                "feed",
+                {
+                    "last_when": when,
+                    "etag": '"x"',
+                    "last_position": (1, 2),
+                    "last_placemark": placemark,
+                },
+            )
+            await store.save("empty", {})
+            await store.close()
+
+            store = inrcot.StateStore(path)
+            states = await store.load()
+            await store.close()
+
+        assert states["feed"]["last_when"] == when
+        assert states["feed"]["etag"] == '"x"'
+        assert states["feed"]["last_modified"] is None
+        assert states["feed"]["last_position"] == (1, 2)
+        restored = states["feed"]["last_placemark"]
+        assert (
+            restored.name,
+            restored.lat,
+            restored.lon,
+            restored.alt,
+            restored.when,
+        ) == ("Unit", 1.5, 2.5, 10.0, when)
+        assert states["empty"] == {"etag": None, "last_modified": None}
+
+    async def test_upgrade(self):
+        """Test a state file from before the last point was kept still loads."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "state.db")
+            with sqlite3.connect(path) as db:
+                db.execute(
+                    "CREATE TABLE feed_state (feed_name TEXT PRIMARY KEY, "
+                    "last_when TEXT, etag TEXT, last_modified TEXT, lat REAL, "
+                    "lon REAL)"
+                )
+                db.execute(
+                    "INSERT INTO feed_state VALUES "
+                    "('feed', '2021-01-01T12:00:00Z', '\"x\"', NULL, 1, 2)"
+                )
+            db.close()
+
+            store = inrcot.StateStore(path)
+            states = await store.load()
+            await store.save("feed", {})
+            await store.close()
+
+        assert states["feed"]["etag"] == '"x"'
+        assert "last_placemark" not in states["feed"]
+
+
+class GeofenceTestCase(unittest.TestCase):
+    """Test for inrcot Geofence."""
+
+    def test_contains(self):
+        """Test points inside a concave polygon are inside the geofence."""
+        # A 'U' shape, open to the north:
+        points = [(0, 0), (0, 3), (3, 3), (3, 2), (1, 2), (1, 1), (3, 1), (3, 0)]
+        for bands in (0, 1, 100):
+            with self.subTest(bands=bands):
+                geofence = inrcot.classes.Geofence(points, bands)
+                self.assertIn((0.5, 1.5), geofence)
+                self.assertIn((2, 0.5), geofence)
+                self.assertIn((2, 2.5), geofence)
+                self.assertNotIn((2, 1.5), geofence)
+                self.assertNotIn((4, 1.5), geofence)
+                self.assertNotIn((-1, -1), geofence)
+
+    def test_placemark_filter(self):
+        """Test Placemarks are filtered by bbox, geofence & attributes."""
+        placemark = inrcot.classes.Placemark(
+            "Test", 33.87, -118.34, None, None, "", imei="300434033719020"
+        )
+        placemark_filter = inrcot.classes.PlacemarkFilter
+        self.assertTrue(placemark_filter()(placemark))
+        self.assertTrue(placemark_filter(bbox=(33, -119, 34, -118))(placemark))
+        self.assertFalse(placemark_filter(bbox=(34, -119, 35, -118))(placemark))
+        self.assertTrue(placemark_filter(bbox=(33, 170, 34, -118))(placemark))
+        self.assertFalse(placemark_filter(bbox=(33, 170, 34, -119))(placemark))
+        geofence = inrcot.classes.Geofence([(33, -119), (34, -118), (33, -118)])
+        self.assertFalse(placemark_filter(geofence=geofence)(placemark))
+        self.assertTrue(
+            placemark_filter(
+                predicates=[inrcot.functions.parse_predicate("imei=1|300434033719020")]
+            )(placemark)
+        )
+
+
+class MetricsTestCase(unittest.TestCase):
+    """Test for inrcot Metrics."""
+
+    def test_render(self):
+        """Test counters, histograms & collected metrics render for Prometheus."""
+        metrics = inrcot.Metrics(buckets=(0.1, 1))
+        metrics.describe("polls_total", "counter", "Polls.")
+        metrics.describe("latency_seconds", "histogram", "Latency.")
+        metrics.collect("depth", "gauge", "Depth.", lambda: 3)
+        metrics.inc("polls_total", feed='a"b')
+        metrics.inc("polls_total", 2, feed='a"b')
+        metrics.observe("latency_seconds", 0.05)
+        metrics.observe("latency_seconds", 0.5)
+        metrics.observe("latency_seconds", 5)
+        self.assertEqual(metrics.get("polls_total", feed='a"b'), 3)
+        self.assertEqual(metrics.get("latency_seconds"), 3)
+        self.assertEqual(
+            metrics.render().splitlines(),
+            [
+                "# HELP polls_total Polls.",
+                "# TYPE polls_total counter",
+                'polls_total{feed="a\\"b"} 3',
+                "# HELP latency_seconds Latency.",
+                "# TYPE latency_seconds histogram",
+                'latency_seconds_bucket{le="0.1"} 1',
+                'latency_seconds_bucket{le="1"} 2',
+                'latency_seconds_bucket{le="+Inf"} 3',
+                "latency_seconds_sum 5.55",
+                "latency_seconds_count 3",
+                "# HELP depth Depth.",
+                "# TYPE depth gauge",
+                "depth 3",
+            ],
+        )
+
+
+@pytest.mark.asyncio
+class TestSink:
+    """Test for inrcot Sink."""
+
+    async def test_put(self):
+        """Test a full sink queue follows its SINK_OVERFLOW policy."""
+        for overflow, expected in (
+            ("drop_oldest", [b"1", b"2"]),
+            ("drop_newest", [b"0", b"1"]),
+        ):
+            sink = inrcot.classes.Sink(
+                "test", {"SINK_QUEUE_SIZE": 2, "SINK_OVERFLOW": overflow}
+            )
+            for data in (b"0", b"1", b"2"):
+                await sink.put(data)
+            assert [sink.queue.get_nowait() for _ in range(2)] == expected
+            assert sink.counters["dropped"] == 1
+
+        sink = inrcot.classes.Sink(
+            "test", {"SINK_QUEUE_SIZE": 1, "SINK_OVERFLOW": "block"}
+        )
+        await sink.put(b"0")
+        put = asyncio.ensure_future(sink.put(b"1"))
+        await asyncio.sleep(0.01)
+        assert not put.done()
+        sink.queue.get_nowait()
+        await asyncio.wait_for(put, 1)
+        assert sink.queue.get_nowait() == b"1"
+
+        with pytest.raises(ValueError):
+            inrcot.classes.Sink("test", {"SINK_OVERFLOW": "bogus"})
+
+    async def test_file_sink(self):
+        """Test a file:// sink appends Events to the file."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "archive.cot")
+            with open(path, "wb") as archive_fd:
+                archive_fd.write(b"<old />")
+            sink = inrcot.classes.Sink("test", {"COT_URL": f"file://{path}"})
+            task = asyncio.ensure_future(sink.run())
+            await sink.put(b"<event />")
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await sink.close()
+            with open(path, "rb") as archive_fd:
+                assert archive_fd.read() == b"<old /><event />"
+            assert sink.counters["sent"] == 1
+
+    async def test_reconnect(self):
+        """Test a sink that can't connect keeps retrying, queuing meanwhile."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        sink = inrcot.classes.Sink(
+            "test",
+            {"COT_URL": f"tcp://127.0.0.1:{port}", "SINK_RECONNECT_INTERVAL": 0.01},
+        )
+        await sink.put(b"<event />")
+        with capture_logs(sink._logger, logging.WARNING) as logs:
+            task = asyncio.ensure_future(sink.run())
+            await asyncio.sleep(0.05)
+        assert not task.done()
+        task.cancel()
+        assert len(logs) > 1
+        assert sink.queue.qsize() == 1
+
+
+@pytest.mark.asyncio
+class TestWorker:
+    """Test for inrcot Worker."""
+
+    @async_fixture(autouse=True)
+    async def serve_feeds(self):
+        """Serve tests/data/test.kml as every feed, closing Workers after."""
+        with open("tests/data/test.kml", "rb") as test_kml_fd:
+            self.test_kml_feed = test_kml_fd.read()
+
+        self.delay: float = 0
+        self.etag: str = '"test-etag"'
+        self.status: int = 200
+        self.requests: list = []
+        self.chunked: bool = False
+        self.gzip: bool = False
+
+        async def feed_handler(request):
+            self.requests.append(request)
+            await asyncio.sleep(self.delay)
+            if self.status != 200:
+                return web.Response(status=self.status, headers={"Retry-After": "90"})
+            if self.etag and request.headers.get("If-None-Match") == self.etag:
+                return web.Response(status=304)
+            response = web.StreamResponse(
+                headers={"ETag": self.etag} if self.etag else None
+            )
+            if self.chunked:
+                response.enable_chunked_encoding()
+            else:
+                response.content_length = len(self.test_kml_feed)
+            if self.gzip:
+                response.enable_compression(web.ContentCoding.gzip)
+            await response.prepare(request)
+            await response.write(self.test_kml_feed)
+            await response.write_eof()
+            return response
+
+        app = web.Application()
+        app.router.add_get("/Feed/Share/{feed}", feed_handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.base_url = str(self.server.make_url("")).rstrip("/")
+        self.cleanups: list = []
+        yield
+        for cleanup in reversed(self.cleanups):
+            await cleanup()
+        await self.server.close()
+
+    def make_worker(
+        self, feeds: int = 1, feed_config: Optional[dict] = None, **kwargs
+    ) -> inrcot.classes.Worker:
+        """Make a Worker polling the test server."""
+        orig_config = make_config(self.base_url, feeds, feed_config, **kwargs)
+        worker = inrcot.classes.Worker(
+            asyncio.Queue(), orig_config["inrcot"], orig_config
+        )
+        self.cleanups.append(worker.close)
+        return worker
+
+    async def test_get_inreach_feeds(self):
+        """Test polling a feed puts a CoT Event on the queue."""
+        worker = self.make_worker()
+        await worker.get_inreach_feeds()
+        event = worker.queue.get_nowait()
+        assert b"Greg Albrecht (inReach)" in event
+
+    async def test_get_inreach_feeds_concurrently(self):
+        """Test feeds are polled concurrently, bounded by MAX_CONCURRENT_POLLS."""
+        self.delay = 0.2
+        worker = self.make_worker(feeds=8, MAX_CONCURRENT_POLLS=4)
+        start = time.monotonic()
+        await worker.get_inreach_feeds()
+        elapsed = time.monotonic() - start
+        assert worker.queue.qsize() == 8
+        assert elapsed >= 0.4
+        assert elapsed < 0.8
+
+    async def test_get_inreach_feeds_timeout(self):
+        """Test a slow feed times out without raising."""
+        self.delay = 2
+        worker = self.make_worker(POLL_TIMEOUT=1)
+        await worker.get_inreach_feeds()
+        assert worker.queue.empty()
+        assert (
+            worker.metrics.get(
+                "inrcot_poll_duration_seconds",
+                feed="inrcot_feed_0",
+                outcome="timeout",
+            )
+            == 1
+        )
+
+    async def test_shared_session(self):
+        """Test one pooled HTTP session is reused across polls and closed."""
+        self.etag = ""
+        worker = self.make_worker(feeds=3, CONNECTION_LIMIT=5, DNS_CACHE_TTL=10)
+        await worker.get_inreach_feeds()
+        session = worker.session
+        await worker.get_inreach_feeds()
+        assert worker.session is session
+        assert session.connector.limit == 5
+        assert worker.queue.qsize() == 6
+
+        await worker.close()
+        assert session.closed
+        assert worker.session is None
+
+    async def test_incremental_poll(self):
+        """Test already seen points are skipped and d1 is sent on later polls."""
+        self.etag = ""
+        worker = self.make_worker(INCREMENTAL_POLL=True)
+        await worker.get_inreach_feeds()
+        first = worker.queue.get_nowait()
+        await worker.get_inreach_feeds()
+        assert "d1" not in self.requests[0].query
+        assert self.requests[1].query["d1"] == "2021-07-22T15:22z"
+
+        # With no new points, the latest is re-sent with a fresh stale:
+        refreshed = worker.queue.get_nowait()
+        assert worker.queue.empty()
+        assert re.sub(b'stale="[^"]+"', b"", refreshed) == re.sub(
+            b'stale="[^"]+"', b"", first
+        )
+
+        # ...unless DEDUP_REFRESH says it was sent recently enough:
+        worker = self.make_worker(INCREMENTAL_POLL=True, DEDUP_EVENTS=True)
+        await worker.get_inreach_feeds()
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 1
+
+    async def test_bad_response(self):
+        """Test points from a bad response are sent, or not marked as seen."""
+        self.etag = ""
+        good_kml_feed = self.test_kml_feed
+        folder = good_kml_feed[: good_kml_feed.index(b"</Folder>") + len(b"</Folder>")]
+
+        # A truncated response still sends what was rendered before the error:
+        self.test_kml_feed = folder + b"<Folder><Placemark"
+        worker = self.make_worker(INCREMENTAL_POLL=True)
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 1
+        assert worker.feed_state["inrcot_feed_0"]["failures"] == 1
+
+        # A malformed chunk isn't rendered at all, so its points aren't lost:
+        self.test_kml_feed = folder + b"</Bogus>"
+        worker = self.make_worker(INCREMENTAL_POLL=True)
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 0
+        assert "last_when" not in worker.feed_state["inrcot_feed_0"]
+        self.test_kml_feed = good_kml_feed
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 1
+
+    async def test_conditional_get(self):
+        """Test an unchanged feed is short-circuited by a 304, re-sending its point."""
+        worker = self.make_worker()
+        await worker.get_inreach_feeds()
+        first = worker.queue.get_nowait()
+        await worker.get_inreach_feeds()
+        assert self.requests[1].headers["If-None-Match"] == self.etag
+        assert worker.counters["not_modified"] == 1
+        refreshed = worker.queue.get_nowait()
+        assert refreshed != first
+        assert re.sub(b'stale="[^"]+"', b"", refreshed) == re.sub(
+            b'stale="[^"]+"', b"", first
+        )
+
+    async def test_conditional_get_dedup(self):
+        """Test points re-sent on a 304 honor DEDUP_REFRESH."""
+        worker = self.make_worker(DEDUP_EVENTS=True)
+        await worker.get_inreach_feeds()
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 1
+        assert worker.counters["deduplicated"] == 1
+
+    async def test_conditional_get_after_restart(self):
+        """Test a restored ETag & point make polls after a restart conditional."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            state_file = os.path.join(tmpdir, "state.db")
+            worker = self.make_worker(STATE_FILE=state_file)
+            await worker.get_inreach_feeds()
+            first = worker.queue.get_nowait()
+            await worker.close()
+
+            worker = self.make_worker(STATE_FILE=state_file)
+            await worker.load_state()
+            await worker.get_inreach_feeds()
+            assert self.requests[-1].headers["If-None-Match"] == self.etag
+            assert worker.counters["not_modified"] == 1
+            refreshed = worker.queue.get_nowait()
+            assert worker.queue.empty()
+            assert re.sub(b'stale="[^"]+"', b"", refreshed) == re.sub(
+                b'stale="[^"]+"', b"", first
+            )
+
+    async def test_batch_events(self):
+        """Test a poll's CoT Events are put on the queue as one batch."""
+        self.test_kml_feed = repeat_folders(self.test_kml_feed, 5)
+        worker = self.make_worker(BATCH_EVENTS=True)
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 1
+        batch = worker.queue.get_nowait()
+        assert batch.count(b"<event ") == 5
+
+    async def test_batch_events_max_size(self):
+        """Test batches of CoT Events are capped at MAX_BATCH_SIZE."""
+        self.test_kml_feed = repeat_folders(self.test_kml_feed, 5)
+        worker = self.make_worker(BATCH_EVENTS=True, MAX_BATCH_SIZE=1400)
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 2
+        while not worker.queue.empty():
+            assert len(worker.queue.get_nowait()) <= 1400
+
+    async def test_track_mode_points(self):
+        """Test TRACK_MODE=points sends every decimated point of a track."""
+        with open("tests/data/track.kml", "rb") as test_kml_fd:
+            self.test_kml_feed = test_kml_fd.read()
+        worker = self.make_worker(
+            feed_config={"TRACK_MODE": "points", "TRACK_TOLERANCE": 25}
+        )
+        await worker.get_inreach_feeds()
+        assert "d1" in self.requests[0].query
+
+        events = [ET.fromstring(worker.queue.get_nowait()) for _ in range(5)]
+        assert worker.queue.empty()
+        assert [event.get("uid") for event in events] == [
+            "Garmin-inReach.GregAlbrecht.2021-07-22T15:00:00Z",
+            "Garmin-inReach.GregAlbrecht.2021-07-22T15:20:00Z",
+            "Garmin-inReach.GregAlbrecht.2021-07-22T15:30:00Z",
+            "Garmin-inReach.GregAlbrecht.2021-07-22T15:40:00Z",
+            "Garmin-inReach.GregAlbrecht",
+        ]
+        assert events[-1].find("point").get("lat") == "33.875"
+
+        # Later polls only re-send the latest point, not the whole trail again:
+        self.etag = ""
+        await worker.get_inreach_feeds()
+        await worker.get_inreach_feeds()
+        events = [ET.fromstring(worker.queue.get_nowait()) for _ in range(2)]
+        assert worker.queue.empty()
+        assert [event.get("uid") for event in events] == [
+            "Garmin-inReach.GregAlbrecht"
+        ] * 2
+
+    async def test_track_mode_filter(self):
+        """Test track points are filtered by position, apart from the latest."""
+        with open("tests/data/track.kml", "rb") as test_kml_fd:
+            self.test_kml_feed = test_kml_fd.read()
+        for bbox, uids in (
+            # Only the latest point is inside:
+            ("33.8745,-118.36,33.88,-118.34", ["Garmin-inReach.GregAlbrecht"]),
+            # Only the history is inside, the unit has since left:
+            (
+                "33.86,-118.36,33.8735,-118.34",
+                [
+                    "Garmin-inReach.GregAlbrecht.2021-07-22T15:00:00Z",
+                    "Garmin-inReach.GregAlbrecht.2021-07-22T15:10:00Z",
+                    "Garmin-inReach.GregAlbrecht.2021-07-22T15:20:00Z",
+                    "Garmin-inReach.GregAlbrecht.2021-07-22T15:30:00Z",
+                ],
+            ),
+        ):
+            worker = self.make_worker(
+                feed_config={"TRACK_MODE": "points", "TRACK_TOLERANCE": 0},
+                FILTER_BBOX=bbox,
+            )
+            await worker.get_inreach_feeds()
+            events = [
+                ET.fromstring(worker.queue.get_nowait()) for _ in range(len(uids))
+            ]
+            assert worker.queue.empty()
+            assert [event.get("uid") for event in events] == uids
+
+    async def test_track_mode_route(self):
+        """Test TRACK_MODE=route sends a track as one drawn line."""
+        with open("tests/data/track.kml", "rb") as test_kml_fd:
+            self.test_kml_feed = test_kml_fd.read()
+        worker = self.make_worker(feed_config={"TRACK_MODE": "route"})
+        await worker.get_inreach_feeds()
+
+        route = ET.fromstring(worker.queue.get_nowait())
+        event = ET.fromstring(worker.queue.get_nowait())
+        assert route.get("type") == "u-d-f"
+        assert route.get("uid") == "Garmin-inReach.GregAlbrecht.track"
+        assert [link.get("point") for link in route.find("detail").findall("link")] == [
+            "33.87,-118.35",
+            "33.872,-118.35",
+            "33.873,-118.3446",
+            "33.874,-118.35",
+            "33.875,-118.35",
+        ]
+        assert event.get("uid") == "Garmin-inReach.GregAlbrecht"
+
+    async def test_next_poll_interval(self):
+        """Test active feeds are polled faster & idle feeds back off."""
+        worker = self.make_worker(
+            POLL_INTERVAL=120,
+            POLL_INTERVAL_MIN=30,
+            POLL_INTERVAL_MAX=600,
+            POLL_JITTER=0,
+        )
+        feed_state: dict = {"active": True}
+        assert worker.next_poll_interval(feed_state, True) == 30
+
+        feed_state["active"] = False
+        intervals = [worker.next_poll_interval(feed_state, True) for _ in range(6)]
+        assert intervals == [60, 120, 240, 480, 600, 600]
+
+        feed_state = {"active": True}
+        assert worker.next_poll_interval(feed_state, False) == 240
+
+    async def test_circuit_breaker(self):
+        """Test a failing feed backs off, opens its circuit, then recovers."""
+        self.status = 503
+        worker = self.make_worker(
+            POLL_INTERVAL=10,
+            POLL_JITTER=0,
+            CIRCUIT_BREAKER_FAILURES=3,
+            CIRCUIT_BREAKER_TIMEOUT=600,
+        )
+        feed_conf = worker.inreach_feeds[0]
+        feed_state = worker.feed_state.setdefault(feed_conf["feed_name"], {})
+
+        assert not await worker.get_inreach_feed(feed_conf)
+        assert feed_state["failures"] == 1
+        assert feed_state["retry_after"] == 90
+        assert worker.next_poll_interval(feed_state, False) == 90
+
+        self.status = 500
+        assert not await worker.get_inreach_feed(feed_conf)
+        assert worker.next_poll_interval(feed_state, False) == 40
+        assert not await worker.get_inreach_feed(feed_conf)
+        assert feed_state["circuit"] == "open"
+        assert abs(worker.next_poll_interval(feed_state, False) - 600) <= 1
+
+        # An open circuit skips the feed without polling it:
+        assert not await worker.get_inreach_feed(feed_conf)
+        assert len(self.requests) == 3
+
+        self.status = 200
+        feed_state["circuit_open_until"] = 0
+        assert await worker.get_inreach_feed(feed_conf)
+        assert feed_state["circuit"] == "closed"
+        assert feed_state["failures"] == 0
+        assert not worker.queue.empty()
+
+    async def test_dedup_events(self):
+        """Test unchanged points are suppressed, then refreshed."""
+        self.etag = ""
+        worker = self.make_worker(DEDUP_EVENTS=True, DEDUP_REFRESH=0.001)
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 1
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 1
+        assert worker.counters["deduplicated"] == 1
+
+        # 0.001 * COT_STALE (600) later, the point is sent again:
+        refresh_after = 0.001 * int(inrcot.DEFAULT_COT_STALE)
+        for event in worker.dedup_cache._entries:
+            key, sent = worker.dedup_cache._entries[event]
+            worker.dedup_cache._entries[event] = (key, sent - refresh_after)
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 2
+
+    async def test_warm_restart(self):
+        """Test a restarted Worker resumes from its saved state."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            state_file = os.path.join(tmpdir, "state.db")
+            worker = self.make_worker(INCREMENTAL_POLL=True, STATE_FILE=state_file)
+            await worker.get_inreach_feeds()
+            assert worker.queue.qsize() == 1
+            await worker.close()
+
+            self.etag = ""
+            worker = self.make_worker(INCREMENTAL_POLL=True, STATE_FILE=state_file)
+            await worker.load_state()
+            feed_state = worker.feed_state[worker.inreach_feeds[0]["feed_name"]]
+            assert feed_state["last_when"] is not None
+            assert feed_state["etag"] == '"test-etag"'
+            await worker.get_inreach_feeds()
+            assert "d1" in self.requests[-1].query
+            # Nothing new, so only the restored point is re-sent:
+            assert worker.queue.qsize() == 1
+            assert b"Greg Albrecht (inReach)" in worker.queue.get_nowait()
+            await worker.close()
+
+    async def test_metrics(self):
+        """Test polls are instrumented, and metrics served over HTTP."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        worker = self.make_worker(feeds=2, METRICS_PORT=port)
+        await worker.start_metrics_server()
+        await worker.get_inreach_feeds()
+        await worker.get_inreach_feeds()
+
+        metrics = worker.metrics
+        assert metrics.get("inrcot_http_responses_total", status=200) == 2
+        assert metrics.get("inrcot_http_responses_total", status=304) == 2
+        assert metrics.get(
+            "inrcot_downloaded_bytes_total", feed="inrcot_feed_0"
+        ) == len(self.test_kml_feed)
+        for outcome in ("ok", "not_modified"):
+            assert (
+                metrics.get(
+                    "inrcot_poll_duration_seconds",
+                    feed="inrcot_feed_1",
+                    outcome=outcome,
+                )
+                == 1
+            )
+        assert metrics.get("inrcot_events_total", feed="inrcot_feed_0") == 1
+        assert metrics.get("inrcot_parse_seconds_total") > 0
+        assert metrics.get("inrcot_render_seconds_total") > 0
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                text = await response.text()
+        assert "inrcot_not_modified_total 2\n" in text
+        # Each feed's point, then re-sent on the 304:
+        assert "inrcot_tx_queue_depth 4\n" in text
+        assert (
+            'inrcot_poll_duration_seconds_count{feed="inrcot_feed_0",outcome="ok"} 1\n'
+            in text
+        )
+
+        # Failed polls are timed too:
+        self.status = 503
+        await worker.get_inreach_feeds()
+        assert (
+            metrics.get(
+                "inrcot_poll_duration_seconds",
+                feed="inrcot_feed_0",
+                outcome="http_error",
+            )
+            == 1
+        )
+
+    async def test_parse_executor(self):
+        """Test large feeds are parsed in a thread or process pool."""
+        for executor in ("thread", "process"):
+            worker = self.make_worker(PARSE_EXECUTOR=executor, PARSE_OFFLOAD_SIZE=1)
+            assert worker.parse_executor is not None
+            await worker.get_inreach_feeds()
+            event = worker.queue.get_nowait()
+            assert b"Greg Albrecht (inReach)" in event
+            await worker.close()
+            assert worker.parse_executor is None
+
+    async def test_parse_executor_size(self):
+        """Test feeds are offloaded by their size, not their Content-Length."""
+        submitted: list = []
+
+        class Executor(concurrent.futures.ThreadPoolExecutor):
+            """Thread pool recording what is submitted to it."""
+
+            def submit(self, *args, **kwargs):
+                submitted.append(args)
+                return super().submit(*args, **kwargs)
+
+        size: int = len(self.test_kml_feed)
+        for chunked, gzip, offload_size, offloaded in (
+            (True, False, size, True),
+            (True, False, size + 1, False),
+            (False, True, size, True),
+            (False, True, size + 1, False),
+        ):
+            self.chunked, self.gzip = chunked, gzip
+            submitted.clear()
+            worker = self.make_worker(
+                PARSE_EXECUTOR="thread", PARSE_OFFLOAD_SIZE=offload_size
+            )
+            worker.parse_executor.shutdown()
+            worker.parse_executor = Executor()
+            await worker.get_inreach_feeds()
+            assert b"Greg Albrecht (inReach)" in worker.queue.get_nowait()
+            assert bool(submitted) == offloaded
+            await worker.close()
+
+    async def test_monitor_loop_lag(self):
+        """Test event loop lag is measured."""
+        worker = self.make_worker(LOOP_LAG_INTERVAL=0.01)
+        task = asyncio.ensure_future(worker.monitor_loop_lag())
+        await asyncio.sleep(0)
+        time.sleep(0.1)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        assert worker.metrics.get("inrcot_event_loop_lag_seconds") > 0
+        assert (
+            'inrcot_event_loop_lag_seconds_bucket{le="0.1"}' in worker.metrics.render()
+        )
+
+    async def test_slow_polls(self):
+        """Test slow polls are reported with per-stage timings."""
+        self.delay = 0.1
+        worker = self.make_worker(feeds=2, SLOW_POLL=0.05)
+        with capture_logs(worker._logger, logging.WARNING) as logs:
+            await worker.get_inreach_feeds()
+        assert worker.slow_polls == []
+        assert "2 polls took over 0.05s" in logs[0]
+        assert "inrcot_feed_0" in logs[0]
+        for stage in ("network", "parse", "queue", "render"):
+            assert f"{stage} " in logs[0]
+        assert "timings" not in worker.feed_state["inrcot_feed_0"]
+
+        self.delay = 0
+        worker.slow_poll = 1
+        await worker.get_inreach_feeds()
+        assert worker.slow_polls == []
+
+    async def test_profile_signal(self):
+        """Test PROFILE_SIGNAL toggles cProfile, dumping the profile."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            worker = self.make_worker(PROFILE_SIGNAL="usr1", PROFILE_DIR=tmpdir)
+            worker.install_profile_signal()
+            os.kill(os.getpid(), signal.SIGUSR1)
+            await asyncio.sleep(0.01)
+            assert worker._profiler is not None
+            await worker.get_inreach_feeds()
+            os.kill(os.getpid(), signal.SIGUSR1)
+            await asyncio.sleep(0.01)
+            assert worker._profiler is None
+            profiles = os.listdir(tmpdir)
+            assert len(profiles) == 1
+            stats = pstats.Stats(os.path.join(tmpdir, profiles[0]))
+            assert any(func[2] == "handle_response" for func in stats.stats)
+            await worker.close()
+            assert worker._profile_signum is None
+
+    async def test_placemark_filter(self):
+        """Test filtered points aren't rendered or queued."""
+        worker = self.make_worker(FILTER_BBOX="30,-120,35,-115")
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 1
+
+        worker = self.make_worker(
+            FILTER_POLYGON="30,-120 35,-115 30,-115",
+            FILTER_ATTRIBUTES="device_type=inReach Mini; velocity<10",
+        )
+        await worker.get_inreach_feeds()
+        assert worker.queue.qsize() == 0
+        assert worker.counters["filtered"] == 1
+        assert "inrcot_filtered_total 1\n" in worker.metrics.render()
+
+    async def test_sinks(self):
+        """Test Events are fanned out to each sink, without a full one blocking."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "archive.cot")
+            orig_config = make_config(self.base_url, 3, COT_URL="udp://127.0.0.1:1")
+            orig_config["inrcot_sink_archive"] = {"COT_URL": f"file://{path}"}
+            orig_config["inrcot_sink_slow"] = {
+                "COT_URL": "tcp://127.0.0.1:1",
+                "SINK_QUEUE_SIZE": "1",
+                "SINK_OVERFLOW": "drop_newest",
+            }
+            worker = inrcot.classes.Worker(
+                asyncio.Queue(), orig_config["inrcot"], orig_config
+            )
+            self.cleanups.append(worker.close)
+            archive, slow = worker.sinks
+            assert archive.name == "inrcot_sink_archive"
+            assert slow.config["COT_URL"] == "tcp://127.0.0.1:1"
+
+            task = asyncio.ensure_future(archive.run())
+            await worker.get_inreach_feeds()
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await archive.close()
+
+            assert worker.queue.qsize() == 3
+            assert slow.queue.qsize() == 1
+            assert slow.counters["dropped"] == 2
+            with open(path, "rb") as archive_fd:
+                assert archive_fd.read().count(b"<event ") == 3
+            text = worker.metrics.render()
+            assert 'inrcot_sink_sent_total{sink="inrcot_sink_archive"} 3' in text
+            assert 'inrcot_sink_dropped_total{sink="inrcot_sink_slow"} 2' in text
+            assert 'inrcot_sink_queue_depth{sink="inrcot_sink_slow"} 1' in text
+
+    async def test_reload_feeds(self):
+        """Test feeds are loaded from a roster, and reloaded when it changes."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            roster = os.path.join(tmpdir, "roster.csv")
+            with open(roster, "w", encoding="utf-8") as roster_fd:
+                roster_fd.write(
+                    f"FEED_NAME,FEED_URL\nr0,{self.base_url}/Feed/Share/r0\n"
+                )
+            worker = self.make_worker(feeds=1, FEED_ROSTER=roster, POLL_JITTER=0)
+            assert set(worker._feeds_by_name) == {"inrcot_feed_0", "r0"}
+            assert not worker.reload_feeds()
+
+            with open(roster, "a", encoding="utf-8") as roster_fd:
+                roster_fd.write(f"r1,{self.base_url}/Feed/Share/r1\n")
+            assert worker.reload_feeds()
+            assert "r1" in worker._feeds_by_name
+            assert await worker.scheduler.wait_due() == ["r1"]
+            await worker.poll_feed("r1")
+            assert b"Greg Albrecht (inReach)" in worker.queue.get_nowait()
+
+            # An invalid roster leaves the current feeds in place:
+            with open(roster, "a", encoding="utf-8") as roster_fd:
+                roster_fd.write("r2,not-a-url\n")
+            assert not worker.reload_feeds()
+            assert len(worker.inreach_feeds) == 3
+
+    async def test_reload_feeds_malformed(self):
+        """Test a roster that can't be parsed is ignored until it is fixed."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            roster = os.path.join(tmpdir, "roster.yaml")
+            with open(roster, "w", encoding="utf-8") as roster_fd:
+                roster_fd.write(f"- {{FEED_NAME: r0, FEED_URL: {self.base_url}/r0}}\n")
+            worker = self.make_worker(feeds=0, FEED_ROSTER=roster)
+            assert set(worker._feeds_by_name) == {"r0"}
+
+            with open(roster, "a", encoding="utf-8") as roster_fd:
+                roster_fd.write("- {FEED_NAME: r1, FEED_URL: ")
+            assert not worker.reload_feeds()
+            assert set(worker._feeds_by_name) == {"r0"}
+
+            with open(roster, "a", encoding="utf-8") as roster_fd:
+                roster_fd.write(f"{self.base_url}/r1}}\n")
+            assert worker.reload_feeds()
+            assert set(worker._feeds_by_name) == {"r0", "r1"}
+
+    async def test_update_activity(self):
+        """Test feeds with recent or moving points are active."""
+        worker = self.make_worker()
+        placemark = inrcot.functions.parse_placemark(
+            inrcot.functions.split_feed(self.test_kml_feed)[0]
+        )
+        feed_state: dict = {}
+        worker.update_activity(feed_state, placemark)
+        assert feed_state["active"]
+        worker.update_activity(feed_state, placemark)
+        assert not feed_state["active"]
+
+        placemark.when = datetime.datetime.now(datetime.timezone.utc)
+        worker.update_activity(feed_state, placemark)
+        assert feed_state["active"]
+
+    async def test_run(self):
+        """Test run() polls each feed on its own schedule."""
+        worker = self.make_worker(feeds=2, POLL_INTERVAL=0.1, POLL_JITTER=0)
+        task = asyncio.ensure_future(worker.run())
+        await asyncio.sleep(0.35)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        paths = [request.path for request in self.requests]
+        assert paths.count("/Feed/Share/0") in [3, 4]
+        assert paths.count("/Feed/Share/1") in [3, 4]
+        assert worker.session is None
+
+
+if __name__ == "__main__":
+    unittest.main()
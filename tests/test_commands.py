@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""inReach to Cursor-on-Target Gateway Command Line Tests."""
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+
+import unittest
+
+import inrcot
+import inrcot.commands
+
+__author__ = "Greg Albrecht <oss@undef.net>"
+__copyright__ = "Copyright 2023 Greg Albrecht"
+__license__ = "Apache License, Version 2.0"
+
+
+class CommandsTestCase(unittest.TestCase):
+    """Test for inrcot Command Line."""
+
+    def test_make_config(self):
+        """Test env vars only fill in the app's section, below the config file."""
+        orig_config = inrcot.commands.make_config(
+            inrcot,
+            "inrcot",
+            "tests/data/test-config.ini",
+            {
+                "POLL_INTERVAL": "60",
+                "COT_URL": "udp://10.0.0.1:9999",
+                "COT_TYPE": "a-h-G",
+                "BAD": "100%",
+            },
+        )
+        config = orig_config["inrcot"]
+        self.assertEqual(config["POLL_INTERVAL"], "120")
+        self.assertEqual(config["COT_URL"], "udp://239.2.3.1:6969")
+        self.assertEqual(config["COT_TYPE"], "a-h-G")
+        self.assertNotIn("BAD", config)
+        self.assertTrue(config["COT_HOST_ID"].startswith("inrcot@"))
+        self.assertEqual(config["COT_STALE"], str(inrcot.DEFAULT_COT_STALE))
+
+        feed_config = orig_config["inrcot_feed_aaa"]
+        self.assertNotIn("COT_TYPE", feed_config)
+        self.assertEqual(feed_config["COT_STALE"], str(inrcot.DEFAULT_COT_STALE))
+
+    def test_make_config_no_file(self):
+        """Test configuring from env vars alone."""
+        orig_config = inrcot.commands.make_config(
+            inrcot, "inrcot", None, {"FEED_URL": "https://example.com/x"}
+        )
+        config = orig_config["inrcot"]
+        self.assertEqual(config["FEED_URL"], "https://example.com/x")
+        self.assertEqual(config["COT_URL"], inrcot.commands.pytak.DEFAULT_COT_URL)
+
+    def test_lazy_import(self):
+        """Test importing inrcot doesn't import its functions & classes."""
+        code = (
+            "import sys, inrcot; "
+            "assert 'inrcot.classes' not in sys.modules; "
+            "assert 'aiohttp' not in sys.modules; "
+            "assert inrcot.Worker is sys.modules['inrcot.classes'].Worker"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    @unittest.skipIf(sys.platform == "win32", "needs POSIX signals")
+    def test_run_shards_sigterm(self):
+        """Test SIGTERM to run_shards terminates its shard processes too."""
+        script = textwrap.dedent("""
+            import configparser, os, time
+            import inrcot.commands
+
+            def run_shard(*_args):
+                os.write(1, f"{os.getpid()}\\n".encode())
+                time.sleep(60)
+
+            if __name__ == "__main__":
+                inrcot.commands.run_shard = run_shard
+                orig_config = configparser.ConfigParser()
+                orig_config.add_section("inrcot")
+                inrcot.commands.run_shards("inrcot", orig_config, 2)
+            """)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "shards.py")
+            with open(path, "w", encoding="utf-8") as script_fd:
+                script_fd.write(script)
+            with subprocess.Popen(
+                [sys.executable, path],
+                stdout=subprocess.PIPE,
+                env=dict(os.environ, PYTHONPATH=os.getcwd()),
+            ) as proc:
+                pids = [int(proc.stdout.readline()) for _ in range(2)]
+                proc.send_signal(signal.SIGTERM)
+                self.assertEqual(proc.wait(timeout=30), 128 + signal.SIGTERM)
+
+        deadline = time.monotonic() + 10
+        for pid in pids:
+            while time.monotonic() < deadline:
+                try:
+                    os.kill(pid, 0)
+                except ProcessLookupError:
+                    break
+                time.sleep(0.05)
+            else:
+                os.kill(pid, signal.SIGKILL)
+                self.fail(f"Shard process {pid} outlived run_shards")
+
+
+if __name__ == "__main__":
+    unittest.main()
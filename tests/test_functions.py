@@ -3,6 +3,11 @@
 
 """inReach to Cursor-on-Target Gateway Function Tests."""
 
+import datetime
+import email.utils
+import os
+import tempfile
+
 from configparser import ConfigParser, SectionProxy
 from aiohttp import BasicAuth
 
@@ -149,6 +154,339 @@ class FunctionsTestCase(unittest.TestCase):
         test_cot = inrcot.functions.inreach_to_cot(test_kml, {})
         self.assertEqual(test_cot, None)
 
+    def test_parse_when(self):
+        """Test parsing a TimeStamp as a UTC datetime."""
+        self.assertEqual(
+            inrcot.functions.parse_when(" 2021-07-22T15:22:30Z\n"),
+            datetime.datetime(2021, 7, 22, 15, 22, 30, tzinfo=datetime.timezone.utc),
+        )
+
+    def test_parse_when_bad(self):
+        """Test parsing missing or bad TimeStamps."""
+        self.assertEqual(inrcot.functions.parse_when(None), None)
+        self.assertEqual(inrcot.functions.parse_when("2021-07-22T15:22:30"), None)
+        self.assertEqual(inrcot.functions.parse_when("yesterday"), None)
+
+    def test_make_feed_params(self):
+        """Test making MapShare d1 query parameters."""
+        when = datetime.datetime(2021, 7, 22, 15, 22, 30, tzinfo=datetime.timezone.utc)
+        self.assertEqual(inrcot.functions.make_feed_params(None), {})
+        self.assertEqual(
+            inrcot.functions.make_feed_params(when), {"d1": "2021-07-22T15:22z"}
+        )
+
+    def test_make_feed_headers(self):
+        """Test making conditional GET request headers."""
+        feed_conf = {"feed_headers": {"Authorization": "Basic eHh4Onl5eQ=="}}
+        self.assertEqual(
+            inrcot.functions.make_feed_headers(feed_conf),
+            {"Authorization": "Basic eHh4Onl5eQ=="},
+        )
+
+        feed_state = {
+            "etag": '"abc"',
+            "last_modified": "Thu, 22 Jul 2021 15:22:30 GMT",
+        }
+        headers = inrcot.functions.make_feed_headers({}, feed_state)
+        self.assertEqual(headers["If-None-Match"], '"abc"')
+        self.assertEqual(headers["If-Modified-Since"], "Thu, 22 Jul 2021 15:22:30 GMT")
+
+    def test_parse_placemark(self):
+        """Test parsing an inReach Folder into a Placemark record."""
+        with open("tests/data/test.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+
+        test_kml = inrcot.functions.split_feed(test_kml_feed)[0]
+        placemark = inrcot.functions.parse_placemark(test_kml)
+
+        self.assertEqual(placemark.name, "Greg Albrecht")
+        self.assertEqual(placemark.lat, 33.874926)
+        self.assertEqual(placemark.lon, -118.346915)
+        self.assertEqual(placemark.alt, 22.63)
+        self.assertEqual(placemark.time, "2021-07-22T15:22:30Z")
+        self.assertEqual(placemark.imei, "300434033719020")
+        self.assertEqual(placemark.device_type, "inReach Mini")
+        self.assertEqual(placemark.velocity, 0.0)
+        self.assertEqual(placemark.course, 0.0)
+        self.assertTrue(placemark.valid_fix)
+        self.assertFalse(placemark.in_emergency)
+        self.assertEqual(placemark.event, "Tracking interval received.")
+        self.assertFalse(hasattr(placemark, "__dict__"))
+
+        test_cot = inrcot.functions.inreach_to_cot(placemark, {})
+        self.assertIn(b"Greg Albrecht (inReach)", test_cot)
+
+    def test_parse_placemark_bad_data(self):
+        """Test parsing bad inReach Folders."""
+        for test_file in ["tests/data/bad-data.kml", "tests/data/bad-data2.kml"]:
+            with open(test_file, "rb") as test_kml_fd:
+                test_kml_feed = test_kml_fd.read()
+
+            test_kml = inrcot.functions.split_feed(test_kml_feed)[0]
+            self.assertEqual(inrcot.functions.parse_placemark(test_kml), None)
+
+    def test_make_render_context(self):
+        """Test compiling feed confs into render contexts."""
+        test_config_file = "tests/data/test-config.ini"
+        orig_config: ConfigParser = ConfigParser()
+        orig_config.read(test_config_file)
+        feeds = inrcot.functions.create_feeds(orig_config)
+
+        render_context = feeds[0]["render_context"]
+        self.assertEqual(render_context.cot_type, "a-f-G-U-C")
+        self.assertEqual(render_context.cot_stale, datetime.timedelta(seconds=600))
+        self.assertEqual(render_context.usericon.get("iconsetpath"), "TACOS/taco.png")
+        self.assertEqual(render_context.names, None)
+
+        render_context = feeds[4]["render_context"]
+        self.assertEqual(
+            render_context.names,
+            (
+                "Garmin-inReach.TeamLead",
+                "Team Lead (inReach)",
+                "Garmin inReach User.\r\n Name: Team Lead",
+            ),
+        )
+        self.assertIs(inrcot.functions.get_render_context(feeds[4]), render_context)
+
+        render_context = inrcot.functions.get_render_context({})
+        self.assertEqual(render_context.cot_type, "a-f-g-e-s")
+        self.assertEqual(render_context.usericon, None)
+
+    def test_batch_events(self):
+        """Test joining CoT Events into batches."""
+        events = [b"a" * 4, b"b" * 4, b"c" * 4, b"d" * 10]
+        self.assertEqual(inrcot.functions.batch_events([]), [])
+        self.assertEqual(inrcot.functions.batch_events(events), [b"".join(events)])
+        self.assertEqual(
+            inrcot.functions.batch_events(events, 8),
+            [b"aaaabbbb", b"cccc", b"d" * 10],
+        )
+
+    def test_parse_placemark_track(self):
+        """Test parsing the latest point from a Folder with a track."""
+        with open("tests/data/track.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+
+        test_kml = inrcot.functions.split_feed(test_kml_feed)[0]
+        placemark = inrcot.functions.parse_placemark(test_kml)
+        self.assertEqual(placemark.time, "2021-07-22T15:50:00Z")
+        self.assertEqual(placemark.lat, 33.875)
+
+    def test_parse_track(self):
+        """Test parsing every point in a Folder into a Track."""
+        with open("tests/data/track.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+
+        test_kml = inrcot.functions.split_feed(test_kml_feed)[0]
+        track = inrcot.functions.parse_track(test_kml)
+        self.assertEqual(len(track), 6)
+        self.assertEqual(track.times[0], "2021-07-22T15:00:00Z")
+        self.assertEqual(
+            list(track.lats), [33.87, 33.871, 33.872, 33.873, 33.874, 33.875]
+        )
+        self.assertEqual(track.lons[3], -118.3446)
+        self.assertEqual(track.epochs[1] - track.epochs[0], 600)
+
+    def test_parse_feed(self):
+        """Test parsing every Folder of a feed, with or without tracks."""
+        with open("tests/data/track.kml", "rb") as track_kml_fd:
+            data = track_kml_fd.read()
+        placemarks = inrcot.parse_feed(data)
+        self.assertEqual(len(placemarks), 1)
+        self.assertEqual(placemarks[0].when.isoformat(), "2021-07-22T15:50:00+00:00")
+        self.assertIsNone(placemarks[0].track)
+        self.assertEqual(len(inrcot.parse_feed(data, track=True)[0].track), 6)
+        self.assertEqual(inrcot.parse_feed(b"<kml />"), [])
+
+    def test_decimate_track(self):
+        """Test decimating a Track by distance, time & high-water mark."""
+        with open("tests/data/track.kml", "rb") as test_kml_fd:
+            test_kml_feed = test_kml_fd.read()
+
+        test_kml = inrcot.functions.split_feed(test_kml_feed)[0]
+        track = inrcot.functions.parse_track(test_kml)
+
+        self.assertEqual(inrcot.functions.decimate_track(track), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(
+            inrcot.functions.decimate_track(track, tolerance=25), [0, 2, 3, 4, 5]
+        )
+        self.assertEqual(
+            inrcot.functions.decimate_track(track, min_interval=1200), [0, 2, 4, 5]
+        )
+        self.assertEqual(
+            inrcot.functions.decimate_track(track, since=track.epochs[3]), [4, 5]
+        )
+
+    def test_douglas_peucker(self):
+        """Test simplifying a line."""
+        xs = [0, 1, 2, 3, 4]
+        ys = [0, 0.1, 5, 0.1, 0]
+        self.assertEqual(inrcot.functions.douglas_peucker(xs, ys, 1), [0, 2, 4])
+        self.assertEqual(inrcot.functions.douglas_peucker(xs, ys, 0), [0, 1, 2, 3, 4])
+        self.assertEqual(inrcot.functions.douglas_peucker(xs, ys, 10), [0, 4])
+
+    def test_create_feeds_sharded(self):
+        """Test sharding creates each feed on exactly one, stable, shard."""
+        config = ConfigParser()
+        for feed in range(50):
+            config.add_section(f"inrcot_feed_{feed}")
+            config[f"inrcot_feed_{feed}"]["FEED_URL"] = "http://localhost/"
+
+        shards = [inrcot.create_feeds(config, shard, 4) for shard in range(4)]
+        names = [feed["feed_name"] for shard in shards for feed in shard]
+        self.assertEqual(sorted(names), sorted(config.sections()))
+        self.assertTrue(all(shard for shard in shards))
+        for shard, feeds in enumerate(shards):
+            for feed in feeds:
+                self.assertEqual(inrcot.shard_for(feed["feed_name"], 4), shard)
+        self.assertEqual(inrcot.shard_for("inrcot_feed_0", 4), 2)
+        self.assertEqual(len(inrcot.create_feeds(config)), 50)
+
+    def test_load_roster(self):
+        """Test loading feeds in bulk from CSV, JSON & YAML rosters."""
+        feeds = inrcot.load_roster("tests/data/roster.csv")
+        self.assertEqual([feed["feed_name"] for feed in feeds], ["alpha", "bravo"])
+        self.assertEqual(feeds[0]["cot_type"], "a-f-G-U-C")
+        self.assertEqual(feeds[0]["cot_name"], "Alpha 1")
+        self.assertNotIn("feed_headers", feeds[0])
+        self.assertEqual(feeds[1]["cot_type"], inrcot.DEFAULT_COT_TYPE)
+        self.assertIn("Authorization", feeds[1]["feed_headers"])
+
+        feeds = inrcot.load_roster("tests/data/roster.json")
+        self.assertEqual(
+            feeds[0]["feed_name"], "https://share.garmin.com/Feed/Share/alpha"
+        )
+        self.assertEqual(feeds[0]["cot_type"], "a-f-G-U-C")
+        self.assertEqual(feeds[0]["cot_stale"], "300")
+        self.assertEqual(feeds[1]["cot_type"], "a-h-G")
+        self.assertEqual(feeds[1]["render_context"].cot_type, "a-h-G")
+
+        try:
+            import yaml  # NOQA pylint: disable=import-outside-toplevel,unused-import
+        except ImportError:
+            return
+        feeds = inrcot.load_roster("tests/data/roster.yaml")
+        self.assertEqual([feed["track_mode"] for feed in feeds], ["route", "points"])
+
+    def test_load_roster_sharded(self):
+        """Test rosters are sharded like config sections."""
+        shards = [
+            inrcot.load_roster("tests/data/roster.csv", shard, 2) for shard in (0, 1)
+        ]
+        self.assertEqual(sum(len(feeds) for feeds in shards), 2)
+
+    def test_load_roster_invalid(self):
+        """Test invalid rosters raise ValueError."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, roster in (
+                ("no_url.json", '[{"COT_TYPE": "a-f-G"}]'),
+                ("bad_url.json", '[{"FEED_URL": "share.garmin.com"}]'),
+                ("bad_stale.json", '[{"FEED_URL": "http://x/", "COT_STALE": "x"}]'),
+                ("dupe.json", '[{"FEED_URL": "http://x/"}, {"FEED_URL": "http://x/"}]'),
+                ("not_feeds.json", '"feeds"'),
+                ("bad.json", '[{"FEED_URL": '),
+                ("bad.yaml", "feeds: [{FEED_URL: http://x/"),
+                ("bad.csv", "FEED_NAME,FEED_URL\nr0," + "x" * 200000),
+                ("roster.txt", ""),
+            ):
+                path = os.path.join(tmpdir, name)
+                with open(path, "w", encoding="utf-8") as roster_fd:
+                    roster_fd.write(roster)
+                with self.subTest(name=name), self.assertRaises(ValueError):
+                    inrcot.load_roster(path)
+
+    def test_parse_retry_after(self):
+        """Test parsing Retry-After headers as seconds or HTTP-dates."""
+        self.assertEqual(inrcot.parse_retry_after("120"), 120)
+        self.assertIsNone(inrcot.parse_retry_after(None))
+        self.assertIsNone(inrcot.parse_retry_after("soon"))
+        self.assertEqual(inrcot.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        retry_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+            seconds=300
+        )
+        self.assertAlmostEqual(
+            inrcot.parse_retry_after(email.utils.format_datetime(retry_at)),
+            300,
+            delta=2,
+        )
+
+    def test_make_placemark_filter(self):
+        """Test making a Placemark filter from FILTER_* config."""
+        self.assertIsNone(inrcot.functions.make_placemark_filter({}))
+        placemark_filter = inrcot.functions.make_placemark_filter(
+            {
+                "FILTER_BBOX": "30, -120, 35, -115",
+                "FILTER_POLYGON": "30,-120 35,-120 35,-115",
+                "FILTER_ATTRIBUTES": "imei != 1|2 ; in_emergency=false; velocity>1",
+            }
+        )
+        self.assertEqual(placemark_filter.bbox, (30, -120, 35, -115))
+        self.assertEqual(placemark_filter.geofence.north, 35)
+        self.assertEqual(len(placemark_filter.predicates), 3)
+        (_, not_in), (_, is_false), (_, faster) = placemark_filter.predicates
+        self.assertTrue(not_in("3"))
+        self.assertFalse(not_in("2"))
+        self.assertTrue(is_false(False))
+        self.assertFalse(is_false(None))
+        self.assertTrue(faster(1.5))
+        self.assertFalse(faster(None))
+
+        for key, value in (
+            ("FILTER_BBOX", "1,2,3"),
+            ("FILTER_BBOX", "3,0,1,1"),
+            ("FILTER_POLYGON", "1,2 3,4"),
+            ("FILTER_POLYGON", "1,2 3,4 5"),
+            ("FILTER_ATTRIBUTES", "bogus=1"),
+            ("FILTER_ATTRIBUTES", "velocity>fast"),
+            ("FILTER_ATTRIBUTES", "imei>5"),
+            ("FILTER_ATTRIBUTES", "name<m"),
+            ("FILTER_ATTRIBUTES", "imei"),
+        ):
+            with self.subTest(key=key, value=value):
+                with self.assertRaises(ValueError):
+                    inrcot.functions.make_placemark_filter({key: value})
+
+    def test_create_sinks(self):
+        """Test sinks are created from inrcot_sink_* sections."""
+        orig_config: ConfigParser = ConfigParser()
+        orig_config.read_dict(
+            {
+                "inrcot": {"COT_URL": "tcp://10.0.0.1:8087", "TAK_PROTO": "0"},
+                "inrcot_sink_archive": {"COT_URL": "file:///tmp/archive.cot"},
+                "inrcot_feed_a": {"FEED_URL": "https://example.com/a"},
+            }
+        )
+        sinks = inrcot.functions.create_sinks(orig_config, orig_config["inrcot"])
+        self.assertEqual(len(sinks), 1)
+        self.assertEqual(sinks[0].name, "inrcot_sink_archive")
+        self.assertEqual(sinks[0].config["COT_URL"], "file:///tmp/archive.cot")
+        self.assertEqual(sinks[0].config["TAK_PROTO"], "0")
+        self.assertEqual(sinks[0].overflow, inrcot.DEFAULT_SINK_OVERFLOW)
+
+        for sink_config in (
+            {},
+            {"COT_URL": "udp://10.0.0.2:6969", "SINK_OVERFLOW": "x"},
+        ):
+            orig_config["inrcot_sink_bad"] = sink_config
+            with self.subTest(sink_config=sink_config):
+                with self.assertRaises(ValueError):
+                    inrcot.functions.create_sinks(orig_config, orig_config["inrcot"])
+
+    def test_make_feed_conf_track_mode(self):
+        """Test TRACK_MODE feed config."""
+        orig_config: ConfigParser = ConfigParser()
+        orig_config.read_dict(
+            {
+                "inrcot_feed_a": {"TRACK_MODE": "Route", "TRACK_TOLERANCE": "50"},
+                "inrcot_feed_b": {"TRACK_MODE": "bogus"},
+            }
+        )
+        feeds = inrcot.functions.create_feeds(orig_config)
+        self.assertEqual(feeds[0]["track_mode"], "route")
+        self.assertEqual(feeds[0]["track_tolerance"], 50.0)
+        self.assertEqual(feeds[1]["track_mode"], None)
+
 
 if __name__ == "__main__":
     unittest.main()